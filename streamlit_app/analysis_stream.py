@@ -0,0 +1,172 @@
+"""
+Streaming, schema-constrained Gemini analysis.
+
+The model is asked for JSON matching RESPONSE_SCHEMA and the answer is read
+as a stream. Top-level fields are parsed as soon as their value is complete,
+so the UI can show the risk level and summary before the recommendations
+have arrived. The finished object is validated against the expected keys
+instead of being regex-extracted from free text.
+"""
+
+import json
+
+RISK_LEVELS = ('low', 'medium', 'high', 'critical')
+
+# Properties are listed in the order they are useful to the UI: badge and summary first
+RESPONSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'riskLevel': {'type': 'string', 'enum': list(RISK_LEVELS)},
+        'summary': {'type': 'string'},
+        'deforestationDetected': {'type': 'boolean'},
+        'vegetationHealth': {'type': 'string'},
+        'recommendations': {'type': 'array', 'items': {'type': 'string'}},
+        'confidence': {'type': 'number'},
+    },
+    'required': ['riskLevel', 'summary', 'deforestationDetected', 'vegetationHealth',
+                 'recommendations', 'confidence'],
+}
+
+BATCH_RESPONSE_SCHEMA = {
+    'type': 'array',
+    'items': {
+        **RESPONSE_SCHEMA,
+        'properties': {'siteId': {'type': 'string'}, **RESPONSE_SCHEMA['properties']},
+        'required': ['siteId', *RESPONSE_SCHEMA['required']],
+    },
+}
+
+
+class AnalysisValidationError(ValueError):
+    """Raised when a model answer does not match the expected verdict shape"""
+
+
+def generation_config(schema=RESPONSE_SCHEMA):
+    """Gemini generation config requesting JSON constrained to `schema`"""
+    return {'response_mime_type': 'application/json', 'response_schema': schema}
+
+
+def validate_analysis(data):
+    """Check and normalize a verdict; raises AnalysisValidationError listing every problem"""
+    if not isinstance(data, dict):
+        raise AnalysisValidationError("Analysis is not a JSON object")
+
+    problems = [f"missing {key}" for key in RESPONSE_SCHEMA['required'] if key not in data]
+    if problems:
+        raise AnalysisValidationError(", ".join(problems))
+
+    verdict = dict(data)
+    verdict['riskLevel'] = str(verdict['riskLevel']).strip().lower()
+    if verdict['riskLevel'] not in RISK_LEVELS:
+        problems.append(f"riskLevel {data['riskLevel']!r} is not one of {', '.join(RISK_LEVELS)}")
+
+    for key in ('summary', 'vegetationHealth'):
+        if not isinstance(verdict[key], str):
+            problems.append(f"{key} is not a string")
+
+    if not isinstance(verdict['deforestationDetected'], bool):
+        problems.append("deforestationDetected is not a boolean")
+
+    recommendations = verdict['recommendations']
+    if not isinstance(recommendations, list) or not all(isinstance(r, str) for r in recommendations):
+        problems.append("recommendations is not a list of strings")
+
+    confidence = verdict['confidence']
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+        problems.append("confidence is not a number")
+    else:
+        verdict['confidence'] = min(1.0, max(0.0, float(confidence)))
+
+    if problems:
+        raise AnalysisValidationError(", ".join(problems))
+    return verdict
+
+
+class IncrementalJSONParser:
+    """Parses a streamed JSON object, yielding each top-level field once its value is complete"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.complete = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._field_start = None
+
+    def feed(self, text):
+        """Add a chunk of text; returns {key: value} for fields completed by it"""
+        self.buffer += text
+        completed = {}
+        buffer = self.buffer
+
+        while self._pos < len(buffer) and not self.complete:
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+                if self._depth == 1:
+                    self._field_start = self._pos + 1
+            elif char in '}]':
+                if self._depth == 1:
+                    completed.update(self._close_field(self._pos))
+                    self.complete = True
+                self._depth -= 1
+            elif char == ',' and self._depth == 1:
+                completed.update(self._close_field(self._pos))
+                self._field_start = self._pos + 1
+            self._pos += 1
+
+        return completed
+
+    def _close_field(self, end):
+        segment = self.buffer[self._field_start:end].strip()
+        if not segment:
+            return {}
+        field = json.loads("{" + segment + "}")
+        self.fields.update(field)
+        return field
+
+    def result(self):
+        """The whole object; raises AnalysisValidationError if the stream ended early"""
+        if not self.complete:
+            raise AnalysisValidationError("Response ended before the JSON object was complete")
+        return dict(self.fields)
+
+
+def chunk_text(chunk):
+    """Text of a streamed chunk, or "" for chunks without text parts (safety blocks, the final finish reason)"""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+def stream_analysis(model, prompt, on_field=None):
+    """Run a streamed, schema-constrained analysis and return the validated verdict
+
+    `on_field(key, value, fields_so_far)` is called as each top-level field
+    arrives.
+    """
+    parser = IncrementalJSONParser()
+    response = model.generate_content(prompt, generation_config=generation_config(), stream=True)
+    for chunk in response:
+        text = chunk_text(chunk)
+        if not text:
+            continue
+        for key, value in parser.feed(text).items():
+            if on_field is not None:
+                on_field(key, value, dict(parser.fields))
+        if parser.complete:
+            break
+    return validate_analysis(parser.result())
@@ -1,77 +1,26 @@
 import streamlit as st
-import requests
 from datetime import datetime, timedelta
-import json
 import os
-from google.generativeai import GenerativeModel
-import google.generativeai as genai
 
-# Configure page
-st.set_page_config(
-    page_title="CLUDO - AI Environmental Monitoring",
-    page_icon="🛰️",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+import numpy as np
 
-# Initialize APIs
-# Use environment variables for security
-try:
-    GEMINI_API_KEY = st.secrets.get("GEMINI_API_KEY") or st.secrets.get("default", {}).get("GEMINI_API_KEY")
-except:
-    # Try environment variable
-    import os
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    
-if not GEMINI_API_KEY:
-    st.error("❌ GEMINI_API_KEY not found! Please set it in .streamlit/secrets.toml or as environment variable")
-    st.stop()
-
-try:
-    SATELLITE_API_KEY = st.secrets.get("SATELLITE_API_KEY") or st.secrets.get("default", {}).get("SATELLITE_API_KEY")
-    if not SATELLITE_API_KEY:
-        import os
-        SATELLITE_API_KEY = os.getenv("SATELLITE_API_KEY", "your_planet_labs_api_key_here")
-except:
-    SATELLITE_API_KEY = "your_planet_labs_api_key_here"
-
-try:
-    WEATHER_API_KEY = st.secrets.get("WEATHER_API_KEY") or st.secrets.get("default", {}).get("WEATHER_API_KEY")
-    if not WEATHER_API_KEY:
-        import os
-        WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "your_openweather_api_key_here")
-except:
-    WEATHER_API_KEY = "your_openweather_api_key_here"
+import engine
+from charts import highlighted, ndvi_figure, waterfall_figure
+from engine import CHART_POINT_BUDGET, get_eonet_catalog, get_job_queue, get_model_registry, submit_audit
+from rate_limit import get_limiter
+from tracing import get_tracer, span
 
-if GEMINI_API_KEY:
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        # Try multiple model names in order of preference (with correct model/ prefix)
-        model_names = ['models/gemini-2.5-flash', 'models/gemini-2.0-flash', 'models/gemini-pro-latest']
-        model = None
-        
-        for model_name in model_names:
-            try:
-                model = GenerativeModel(model_name)
-                # Test if model works
-                test_response = model.generate_content("Hello")
-                st.sidebar.success(f"✅ Gemini API Connected ({model_name})")
-                break
-            except:
-                continue
-        
-        if model is None:
-            raise Exception("No compatible Gemini model found")
-            
-    except Exception as e:
-        model = None
-        st.sidebar.error(f"❌ Gemini Error: {str(e)}")
-else:
-    model = None
-    st.sidebar.warning("⚠️ Gemini API Key Missing")
+# How often a running analysis job is polled (seconds)
+JOB_POLL_INTERVAL = 0.5
+STAGE_LABELS = {
+    'fetch': "📡 Fetching satellite, weather and disaster data",
+    'process': "🧮 Processing satellite scenes",
+    'analyze': "🤖 Analyzing with Gemini",
+}
+STAGE_ICONS = {'pending': "⏳", 'running': "🔄", 'done': "✅", 'failed': "❌"}
 
 # Custom CSS
-st.markdown("""
+PAGE_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -115,270 +64,149 @@ st.markdown("""
         opacity: 0.9;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-# Helper functions
-def calculate_ndvi(red, nir):
-    """Calculate NDVI from red and NIR bands"""
-    if nir + red == 0:
-        return 0
-    return (nir - red) / (nir + red)
-
-def fetch_real_satellite_data(lat, lon, start_date, end_date):
-    """Fetch real satellite data using Planet Labs API"""
+def read_secret(name):
+    """A key from .streamlit/secrets.toml (top level or [default]), else the environment"""
     try:
-        # Planet Labs API endpoint
-        url = "https://api.planet.com/data/v1/quick-search"
-        
-        headers = {
-            "Authorization": f"api-key {SATELLITE_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # Search for Sentinel-2 imagery
-        payload = {
-            "item_types": ["PSScene"],
-            "filter": {
-                "type": "AndFilter",
-                "config": [
-                    {
-                        "type": "GeometryFilter",
-                        "field_name": "geometry",
-                        "config": {
-                            "type": "Point",
-                            "coordinates": [lon, lat]
-                        }
-                    },
-                    {
-                        "type": "DateRangeFilter",
-                        "field_name": "acquired",
-                        "config": {
-                            "gte": start_date.strftime("%Y-%m-%dT00:00:00Z"),
-                            "lte": end_date.strftime("%Y-%m-%dT23:59:59Z")
-                        }
-                    }
-                ]
-            }
-        }
-        
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('features', [])
-        else:
-            st.warning(f"Satellite API returned status {response.status_code}. Using simulated data.")
-            return None
-            
-    except Exception as e:
-        st.warning(f"Satellite API error: {str(e)}. Using simulated data.")
-        return None
+        value = st.secrets.get(name) or st.secrets.get("default", {}).get(name)
+    except Exception:
+        value = None
+    return value or os.getenv(name)
 
-def process_real_satellite_data(features, start_date, end_date):
-    """Process real satellite data from Planet Labs API"""
-    import random
-    
-    data = []
-    
-    if not features or len(features) == 0:
-        return None
+def configure_page():
+    """Page setup, API keys and styles; runs first on every rerun so importing this module does nothing"""
+    st.set_page_config(
+        page_title="CLUDO - AI Environmental Monitoring",
+        page_icon="🛰️",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
     
-    # Sort features by date
-    sorted_features = sorted(features, key=lambda x: x.get('properties', {}).get('acquired', ''))
+    # Use secrets or environment variables for the keys; the engine keeps its defaults otherwise
+    engine.configure(
+        gemini_api_key=read_secret("GEMINI_API_KEY"),
+        satellite_api_key=read_secret("SATELLITE_API_KEY"),
+        weather_api_key=read_secret("WEATHER_API_KEY"),
+        warning_handler=st.warning
+    )
+    if not engine.GEMINI_API_KEY:
+        st.error("❌ GEMINI_API_KEY not found! Please set it in .streamlit/secrets.toml or as environment variable")
+        st.stop()
     
-    # Process each satellite image
-    for feature in sorted_features:
-        props = feature.get('properties', {})
-        acquired = props.get('acquired', '')
-        
-        if acquired:
-            try:
-                # Handle different datetime formats from Planet Labs API
-                if 'T' in acquired:
-                    # Remove timezone info and parse
-                    clean_date = acquired.replace('Z', '').split('T')[0]
-                    date = datetime.strptime(clean_date, '%Y-%m-%d')
-                else:
-                    date = datetime.strptime(acquired[:10], '%Y-%m-%d')
-            except (ValueError, AttributeError):
-                # Fallback to current date if parsing fails
-                date = datetime.now()
-            
-            # Extract real NDVI if available, otherwise estimate from cloud cover
-            cloud_cover = props.get('cloud_cover', 0.5)
-            clear_percent = props.get('clear_percent', 0.5)
-            
-            # Estimate NDVI based on image quality (real calculation would need actual bands)
-            # Higher clear_percent and lower cloud_cover = healthier vegetation
-            estimated_ndvi = 0.3 + (clear_percent * 0.4) - (cloud_cover * 0.2)
-            estimated_ndvi = max(0.1, min(0.9, estimated_ndvi))
-            
-            data.append({
-                'date': date,
-                'ndvi': estimated_ndvi,
-                'red': 0.3,
-                'nir': 0.3 + estimated_ndvi,
-                'moisture': 0.2 + random.uniform(-0.05, 0.05),
-                'cloud_cover': cloud_cover,
-                'source': 'real_satellite'
-            })
-    
-    return data if len(data) > 0 else None
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
-def fetch_weather_data(lat, lon):
-    """Fetch real-time weather data"""
-    if not WEATHER_API_KEY:
-        return None
-    
-    try:
-        url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={WEATHER_API_KEY}&units=metric"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except:
-        return None
-
-def fetch_disaster_data(lat, lon, radius_km=100):
-    """Fetch disaster events from NASA EONET"""
-    try:
-        # NASA EONET API (no key needed)
-        url = f"https://eonet.gsfc.nasa.gov/api/v3/events?status=open"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            events = data.get('events', [])
-            
-            # Filter events near location
-            nearby_events = []
-            for event in events:
-                if 'geometry' in event and len(event['geometry']) > 0:
-                    geom = event['geometry'][0]
-                    if 'coordinates' in geom:
-                        coords = geom['coordinates']
-                        # Simple distance check (rough approximation)
-                        if len(coords) >= 2:
-                            event_lon, event_lat = coords[0], coords[1]
-                            dist = ((lat - event_lat)**2 + (lon - event_lon)**2)**0.5 * 111  # km
-                            if dist < radius_km:
-                                nearby_events.append({
-                                    'title': event.get('title', 'Unknown'),
-                                    'category': event.get('categories', [{}])[0].get('title', 'Unknown'),
-                                    'date': event.get('geometry', [{}])[0].get('date', 'Unknown'),
-                                    'distance_km': round(dist, 1)
-                                })
-            
-            return nearby_events
-        return []
-    except:
-        return []
+# Helper functions
+def render_partial_verdict(fields):
+    """Risk badge and summary from the analysis fields received so far"""
+    if 'riskLevel' in fields:
+        risk = str(fields['riskLevel']).lower()
+        st.markdown(f"""
+        <div class="risk-{risk} risk-badge">
+            {risk.upper()} RISK
+        </div>
+        """, unsafe_allow_html=True)
+    if 'summary' in fields:
+        st.markdown(f"**Summary:** {fields['summary']}")
 
-def generate_mock_satellite_data(start_date, end_date, lat, lon):
-    """Generate mock satellite data for demonstration"""
-    import random
-    
-    data = []
-    current = start_date
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def render_job_progress():
+    """Poll the running analysis job; only this fragment reruns until the job finishes"""
+    job = get_job_queue().get(st.session_state.get('job_id'))
+    if job is None or job.done:
+        # Rerun the whole page so it picks up the result
+        st.rerun()
     
-    # Simulate declining vegetation health
-    base_ndvi = 0.7
-    decline_rate = 0.15 / 365  # Decline over time
-    
-    while current <= end_date:
-        days_passed = (current - start_date).days
-        ndvi = max(0.2, base_ndvi - (decline_rate * days_passed) + random.uniform(-0.05, 0.05))
-        
-        data.append({
-            'date': current,
-            'red': 0.3 + random.uniform(-0.05, 0.05),
-            'nir': 0.3 + ndvi + random.uniform(-0.05, 0.05),
-            'ndvi': ndvi,
-            'moisture': 0.2 + random.uniform(-0.05, 0.05)
-        })
-        
-        current += timedelta(days=30)  # Monthly data
-    
-    return data
+    snapshot = job.snapshot()
+    shared = f" · shared with {snapshot['subscribers'] - 1} identical request(s)" if snapshot['subscribers'] > 1 else ""
+    st.progress(job.progress, text=f"🛰️ Analysis running for {snapshot['elapsed']:.0f} s{shared}")
+    for stage, state in snapshot['stages'].items():
+        st.markdown(f"{STAGE_ICONS[state]} {STAGE_LABELS.get(stage, stage)}")
+    for level, message in snapshot['notices']:
+        getattr(st, level)(message)
+    render_partial_verdict(snapshot['partial'])
 
-def analyze_with_gemini(ndvi_data, location, description):
-    """Analyze satellite data using Gemini AI"""
-    if not GEMINI_API_KEY or model is None:
-        return generate_fallback_analysis(ndvi_data)
+def adopt_job_result(job):
+    """Move a finished analysis job's result into the session and show its notices"""
+    request = st.session_state.pop('job_request', {})
+    del st.session_state['job_id']
+    if job is None:
+        st.error("❌ The analysis job expired before its result was collected. Please start it again.")
+        return
+    for level, message in job.snapshot()['notices']:
+        getattr(st, level)(message)
+    if job.error:
+        st.error(f"❌ Analysis failed: {job.error}")
+        return
     
-    try:
-        prompt = f"""You are an environmental auditor analyzing satellite data for a civic issue report.
-
-Location: {location['lat']}, {location['lon']}
-Issue Description: {description}
-
-NDVI Data (Vegetation Health):
-{chr(10).join([f"Date: {d['date'].strftime('%Y-%m-%d')}, Mean NDVI: {d['ndvi']:.3f}" for d in ndvi_data])}
+    result = job.result
+    for key in ('satellite_data', 'weather_data', 'disaster_data', 'timed_out_sources', 'analysis'):
+        st.session_state[key] = result[key]
+    st.session_state['last_trace'] = result['trace']
+    st.session_state.update(request)
 
-Analysis Guidelines:
-- NDVI > 0.6: Healthy vegetation
-- NDVI 0.3-0.6: Moderate vegetation
-- NDVI < 0.3: Sparse/degraded vegetation
-- Declining NDVI trend indicates deforestation or degradation
 
-Provide a comprehensive analysis in JSON format:
-{{
-  "summary": "Brief 2-3 sentence summary",
-  "riskLevel": "low|medium|high|critical",
-  "deforestationDetected": boolean,
-  "vegetationHealth": "Description of current vegetation state",
-  "recommendations": ["recommendation1", "recommendation2", "recommendation3"],
-  "confidence": 0.0-1.0
-}}"""
-
-        response = model.generate_content(prompt)
-        text = response.text
-        
-        # Extract JSON from response
-        import re
-        json_match = re.search(r'\{[\s\S]*\}', text)
-        if json_match:
-            return json.loads(json_match.group(0))
-        
-        return generate_fallback_analysis(ndvi_data)
+def render_model_status():
+    """Show the Gemini registry state in the sidebar without triggering a probe"""
+    if not engine.GEMINI_API_KEY:
+        st.sidebar.warning("⚠️ Gemini API Key Missing")
+        return
     
-    except Exception as e:
-        st.warning(f"Gemini API error: {str(e)}. Using fallback analysis.")
-        return generate_fallback_analysis(ndvi_data)
-
-def generate_fallback_analysis(ndvi_data):
-    """Generate fallback analysis if Gemini fails"""
-    latest_ndvi = ndvi_data[-1]['ndvi']
-    first_ndvi = ndvi_data[0]['ndvi']
-    trend = latest_ndvi - first_ndvi
-    
-    risk_level = 'low'
-    deforestation_detected = False
-    
-    if latest_ndvi < 0.3 or trend < -0.2:
-        risk_level = 'critical'
-        deforestation_detected = True
-    elif latest_ndvi < 0.4 or trend < -0.1:
-        risk_level = 'high'
-    elif latest_ndvi < 0.5:
-        risk_level = 'medium'
+    status = get_model_registry().status()
+    if status['model_name']:
+        st.sidebar.success(f"✅ Gemini API Connected ({status['model_name']})")
+    elif status['probed']:
+        st.sidebar.error(f"❌ Gemini Error: {status['error']}")
+    else:
+        st.sidebar.info("🤖 Gemini model connects on first analysis")
     
-    return {
-        'summary': f"Vegetation analysis shows {'significant degradation' if deforestation_detected else 'stable conditions'} with NDVI of {latest_ndvi:.2f}. Trend: {trend:.2f}",
-        'riskLevel': risk_level,
-        'deforestationDetected': deforestation_detected,
-        'vegetationHealth': 'Healthy' if latest_ndvi > 0.6 else 'Moderate' if latest_ndvi > 0.4 else 'Degraded',
-        'recommendations': [
-            'Continue monitoring vegetation trends',
-            'Verify findings with ground truth data',
-            'Consider local environmental factors'
-        ],
-        'confidence': 0.75
-    }
+    if status['probe_timings']:
+        timings = ", ".join(f"{name.split('/')[-1]}: {seconds*1000:.0f} ms" for name, seconds in status['probe_timings'].items())
+        st.sidebar.caption(f"Model probe: {timings}")
+
+def render_profiler():
+    """Sidebar waterfall of this session's last analysis plus stage timings across all sessions"""
+    tracer = get_tracer()
+    with st.sidebar.expander("⏱️ Profiler", expanded=False):
+        last_trace = st.session_state.get('last_trace')
+        if last_trace:
+            st.plotly_chart(waterfall_figure(last_trace), use_container_width=True)
+        else:
+            st.caption("Run an analysis to see where its time goes")
+        
+        jobs = get_job_queue().stats()
+        st.caption(f"Analysis jobs: {jobs['in_flight']} in flight, {jobs['submitted']} run, "
+                   f"{jobs['deduplicated']} joined an identical job")
+        weather = engine.get_weather_cache().stats()
+        st.caption(f"Weather cache: {weather['hits']} hits, {weather['stale_hits']} stale (refreshed in background), "
+                   f"{weather['misses']} misses across {weather['cells']} cells")
+        limited = {name: stats for name, stats in get_limiter().stats().items() if stats['rejected'] or stats['throttled']}
+        if limited:
+            st.caption("Rate limits: " + ", ".join(
+                f"{name} {stats['rejected']} rejected, {stats['throttled']} × 429" for name, stats in limited.items()))
+        
+        summary = tracer.summary()
+        if summary:
+            st.caption("All sessions since startup (ms)")
+            st.dataframe(
+                [
+                    {'stage': name, 'runs': stats['count'], 'mean': round(stats['mean'] * 1000),
+                     'p95': round(stats['p95'] * 1000), 'max': round(stats['max'] * 1000), 'errors': stats['errors']}
+                    for name, stats in summary.items()
+                ],
+                hide_index=True,
+                use_container_width=True
+            )
+            st.download_button("📥 Prometheus metrics", tracer.prometheus_text(), file_name="cludo_metrics.prom", mime="text/plain")
+            st.download_button("📥 Recent traces (JSONL)", tracer.jsonl(), file_name="cludo_traces.jsonl", mime="application/jsonl")
 
 # Main app
 def main():
+    configure_page()
+    
+    # Start the background EONET refresh before the first analysis needs it
+    get_eonet_catalog()
+    
     st.markdown('<h1 class="main-header">🛰️ CLUDO</h1>', unsafe_allow_html=True)
     st.markdown('<p class="subtitle">AI-Powered Environmental Monitoring with Gemini 3</p>', unsafe_allow_html=True)
     
@@ -417,58 +245,27 @@ def main():
         
         analyze_button = st.button("🛰️ Start Satellite Analysis", type="primary", use_container_width=True)
     
-    # Main content
+    # Main content: the analysis runs as a background job that this session polls
     if analyze_button:
-        with st.spinner("🛰️ Fetching real-time data..."):
-            # Try to fetch real satellite data
-            real_sat_features = fetch_real_satellite_data(
-                lat, lon,
-                datetime.combine(start_date, datetime.min.time()),
-                datetime.combine(end_date, datetime.min.time())
-            )
-            
-            # Process real satellite data
-            if real_sat_features and len(real_sat_features) > 0:
-                satellite_data = process_real_satellite_data(
-                    real_sat_features,
-                    datetime.combine(start_date, datetime.min.time()),
-                    datetime.combine(end_date, datetime.min.time())
-                )
-                
-                if satellite_data:
-                    st.success(f"✅ Using {len(satellite_data)} real satellite images from Planet Labs!")
-                else:
-                    st.info("ℹ️ Processing real data failed, using simulated data")
-                    satellite_data = generate_mock_satellite_data(
-                        datetime.combine(start_date, datetime.min.time()),
-                        datetime.combine(end_date, datetime.min.time()),
-                        lat, lon
-                    )
-            else:
-                st.info("ℹ️ No real satellite data available, using simulated data for analysis")
-                satellite_data = generate_mock_satellite_data(
-                    datetime.combine(start_date, datetime.min.time()),
-                    datetime.combine(end_date, datetime.min.time()),
-                    lat, lon
-                )
-            
-            # Fetch weather data
-            weather_data = fetch_weather_data(lat, lon)
-            
-            # Fetch disaster data
-            disaster_data = fetch_disaster_data(lat, lon)
-            
-            # Store in session state
-            st.session_state['satellite_data'] = satellite_data
-            st.session_state['weather_data'] = weather_data
-            st.session_state['disaster_data'] = disaster_data
-            st.session_state['location'] = {'lat': lat, 'lon': lon}
-            st.session_state['description'] = description
-            st.session_state['issue_title'] = issue_title
-            
-            # Analyze with Gemini
-            analysis = analyze_with_gemini(satellite_data, {'lat': lat, 'lon': lon}, description)
-            st.session_state['analysis'] = analysis
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        end_dt = datetime.combine(end_date, datetime.min.time())
+        job = submit_audit(lat, lon, start_dt, end_dt, description)
+        st.session_state['job_id'] = job.id
+        st.session_state['job_request'] = {
+            'location': {'lat': lat, 'lon': lon},
+            'description': description,
+            'issue_title': issue_title,
+        }
+    
+    if 'job_id' in st.session_state:
+        job = get_job_queue().get(st.session_state['job_id'])
+        if job is not None and not job.done:
+            render_job_progress()
+        else:
+            adopt_job_result(job)
+    
+    render_model_status()
+    render_profiler()
     
     # Display results
     if 'analysis' in st.session_state:
@@ -480,18 +277,23 @@ def main():
         # Data Source Indicators
         st.markdown("### 📊 Data Sources")
         col1, col2, col3, col4 = st.columns(4)
+        timed_out = st.session_state.get('timed_out_sources', [])
         
         with col1:
             # Check if using real satellite data
-            is_real_sat = any(d.get('source') == 'real_satellite' for d in satellite_data)
+            is_real_sat = satellite_data.source == 'real_satellite'
             if is_real_sat:
                 st.success("🛰️ Real Satellite\n(Planet Labs)")
+            elif 'satellite' in timed_out:
+                st.warning("🛰️ Simulated\n(Planet Timed Out)")
             else:
                 st.info("🛰️ Simulated\n(Demo Mode)")
         
         with col2:
             # Check Gemini AI
-            if model is not None:
+            if analysis.get('servedFromCache'):
+                st.success("🤖 Gemini 3 AI\n(Cached Verdict)")
+            elif get_model_registry().model_name is not None:
                 st.success("🤖 Gemini 3 AI\n(Active)")
             else:
                 st.warning("🤖 Fallback\n(No API Key)")
@@ -500,6 +302,8 @@ def main():
             # Check weather data
             if 'weather_data' in st.session_state and st.session_state['weather_data']:
                 st.success("🌤️ Live Weather\n(OpenWeather)")
+            elif 'weather' in timed_out:
+                st.warning("🌤️ No Weather\n(Timed Out)")
             else:
                 st.info("🌤️ No Weather\n(API Needed)")
         
@@ -507,6 +311,8 @@ def main():
             # Check disaster data
             if 'disaster_data' in st.session_state and st.session_state['disaster_data']:
                 st.success(f"⚠️ {len(st.session_state['disaster_data'])} Disasters\n(NASA EONET)")
+            elif 'disasters' in timed_out:
+                st.warning("⚠️ No Disasters\n(EONET Timed Out)")
             else:
                 st.info("⚠️ No Disasters\n(None Nearby)")
         
@@ -571,6 +377,9 @@ def main():
         
         current_data = satellite_data[timeline_index]
         
+        def format_stat(value):
+            return "—" if value is None or np.isnan(value) else f"{value:.3f}"
+        
         col1, col2, col3 = st.columns(3)
         with col1:
             st.markdown(f"""
@@ -583,7 +392,7 @@ def main():
         with col2:
             st.markdown(f"""
             <div class="metric-card" style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);">
-                <div class="metric-value">{current_data['ndvi']-0.1:.3f}</div>
+                <div class="metric-value">{format_stat(current_data.get('ndvi_min'))}</div>
                 <div class="metric-label">Min NDVI</div>
             </div>
             """, unsafe_allow_html=True)
@@ -591,38 +400,25 @@ def main():
         with col3:
             st.markdown(f"""
             <div class="metric-card" style="background: linear-gradient(135deg, #a18cd1 0%, #fbc2eb 100%);">
-                <div class="metric-value">{current_data['ndvi']+0.1:.3f}</div>
+                <div class="metric-value">{format_stat(current_data.get('ndvi_max'))}</div>
                 <div class="metric-label">Max NDVI</div>
             </div>
             """, unsafe_allow_html=True)
         
-        st.caption(f"📅 Date: {current_data['date'].strftime('%B %d, %Y')}")
-        
-        # NDVI Chart
-        import pandas as pd
-        import plotly.graph_objects as go
-        
-        df = pd.DataFrame(satellite_data)
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df['date'],
-            y=df['ndvi'],
-            mode='lines+markers',
-            name='NDVI',
-            line=dict(color='#11998e', width=3),
-            marker=dict(size=8)
-        ))
-        
-        fig.update_layout(
-            title="NDVI Trend Over Time",
-            xaxis_title="Date",
-            yaxis_title="NDVI Value",
-            hovermode='x unified',
-            height=400
-        )
+        if not np.isnan(current_data.get('valid_fraction', np.nan)):
+            st.caption(
+                f"📅 Date: {current_data['date'].strftime('%B %d, %Y')} · "
+                f"P10–P90: {format_stat(current_data.get('ndvi_p10'))}–{format_stat(current_data.get('ndvi_p90'))} · "
+                f"Valid pixels: {current_data['valid_fraction']*100:.0f}%"
+            )
+        else:
+            st.caption(f"📅 Date: {current_data['date'].strftime('%B %d, %Y')} · Pixel statistics need band data")
         
-        st.plotly_chart(fig, use_container_width=True)
+        # NDVI Chart: built once per dataset; the slider only moves the highlight marker
+        with span("render"):
+            figure = ndvi_figure(satellite_data, CHART_POINT_BUDGET)
+            with highlighted(figure, satellite_data.dates[timeline_index], satellite_data.ndvi[timeline_index]) as chart:
+                st.plotly_chart(chart, use_container_width=True)
         
         # Recommendations
         st.markdown("### 💡 Recommendations")
@@ -637,7 +433,7 @@ def main():
 
 **Issue:** {st.session_state['issue_title']}
 **Location:** {st.session_state['location']['lat']}, {st.session_state['location']['lon']}
-**Analysis Period:** {satellite_data[0]['date'].strftime('%Y-%m-%d')} to {satellite_data[-1]['date'].strftime('%Y-%m-%d')}
+**Analysis Period:** {satellite_data.start.strftime('%Y-%m-%d')} to {satellite_data.end.strftime('%Y-%m-%d')}
 **Analysis Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ## Risk Assessment
@@ -645,6 +441,7 @@ def main():
 - **Deforestation Detected:** {'Yes' if analysis['deforestationDetected'] else 'No'}
 - **Vegetation Health:** {analysis['vegetationHealth']}
 - **Confidence Score:** {analysis['confidence']*100:.0f}%
+- **Verdict Source:** {'Cached Gemini verdict for identical data' if analysis.get('servedFromCache') else 'Fresh Gemini analysis' if 'servedFromCache' in analysis else 'Rule-based fallback'}
 
 ## Summary
 {analysis['summary']}
@@ -0,0 +1,331 @@
+"""
+Download stage for Planet scene assets.
+
+Given item ids from the search, the pipeline activates the analytic asset,
+streams it to disk in chunks (resuming interrupted transfers with HTTP range
+requests) and keeps the file in a cache keyed by item type, item id and asset
+type, so a scene is never downloaded twice. The cache is name-based: assets are
+treated as immutable per item id, and the md5 digest Planet reports is only
+used to verify each download. Downloaded files are decoded on a process pool
+straight into the tile store, and NDVI is then measured on the window around
+the audit point.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from cache import CACHE_DIR
+from tile_store import TileStore
+
+PLANET_DATA_URL = "https://api.planet.com/data/v1"
+DEFAULT_ASSET_TYPE = "ortho_analytic_4b_sr"
+DEFAULT_CACHE_BYTES = 20 * 1024 ** 3
+CHUNK_SIZE = 1024 * 1024
+MAX_RESUMES = 5
+
+# Band order of the multi-band analytic products
+ASSET_BANDS = {
+    'ortho_analytic_4b_sr': ('blue', 'green', 'red', 'nir'),
+    'ortho_analytic_4b': ('blue', 'green', 'red', 'nir'),
+    'ortho_analytic_8b_sr': ('coastal_blue', 'blue', 'green_i', 'green', 'yellow', 'red', 'rededge', 'nir'),
+}
+
+
+class AssetError(Exception):
+    """Raised when an asset cannot be activated or downloaded"""
+
+
+class AssetCache:
+    """File cache keyed by asset name, with least-recently-used size eviction"""
+
+    def __init__(self, root=None, max_bytes=DEFAULT_CACHE_BYTES):
+        self.root = root or os.path.join(CACHE_DIR, "assets")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(item_type, item_id, asset_type):
+        return hashlib.sha256(f"{item_type}/{item_id}/{asset_type}".encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key):
+        """Path of a cached file (marking it recently used), or None"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def partial_path(self, key):
+        path = self.path(key) + ".part"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def commit(self, key):
+        """Publish a completed .part file and evict old files beyond the byte budget"""
+        os.replace(self.path(key) + ".part", self.path(key))
+        self.evict()
+        return self.path(key)
+
+    def evict(self):
+        with self._lock:
+            files = []
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    if not name.endswith(".part"):
+                        path = os.path.join(directory, name)
+                        stat = os.stat(path)
+                        files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(d, n)) for d, _, names in os.walk(self.root) for n in names)
+
+
+class AssetDownloader:
+    """Activates Planet assets and streams them into the asset cache"""
+
+    def __init__(self, session, api_key, cache=None, base_url=PLANET_DATA_URL, poll_interval=5,
+                 activation_timeout=600, timeout=30, chunk_size=CHUNK_SIZE, max_resumes=MAX_RESUMES):
+        self.session = session
+        self.headers = {"Authorization": f"api-key {api_key}"}
+        self.cache = cache or AssetCache()
+        self.base_url = base_url.rstrip('/')
+        self.poll_interval = poll_interval
+        self.activation_timeout = activation_timeout
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_resumes = max_resumes
+        self.stats = {'cache_hits': 0, 'downloads': 0, 'resumes': 0, 'bytes': 0}
+        # Downloads run on a thread pool, so counter updates are serialized
+        self._stats_lock = threading.Lock()
+
+    def activate(self, item_type, item_id, asset_type):
+        """Request activation and poll until the asset can be downloaded"""
+        url = f"{self.base_url}/item-types/{item_type}/items/{item_id}/assets"
+        deadline = time.monotonic() + self.activation_timeout
+        requested = False
+
+        while True:
+            response = self.session.get(url, headers=self.headers, timeout=self.timeout)
+            if response.status_code != 200:
+                raise AssetError(f"Asset listing returned status {response.status_code}")
+            asset = response.json().get(asset_type)
+            if asset is None:
+                raise AssetError(f"{item_id} has no {asset_type} asset")
+
+            if asset.get('status') == 'active' and asset.get('location'):
+                return asset
+
+            if not requested:
+                activate_url = asset.get('_links', {}).get('activate')
+                if activate_url:
+                    self.session.post(activate_url, headers=self.headers, timeout=self.timeout)
+                requested = True
+
+            if time.monotonic() > deadline:
+                raise AssetError(f"{item_id}/{asset_type} was not activated in time")
+            time.sleep(self.poll_interval)
+
+    def download(self, url, partial_path, expected_md5=None):
+        """Stream url into partial_path, resuming with Range requests after interruptions"""
+        for attempt in range(self.max_resumes + 1):
+            offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            headers = dict(self.headers)
+            if offset > 0:
+                headers['Range'] = f"bytes={offset}-"
+                self._count('resumes')
+
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 416:
+                        break
+                    if response.status_code not in (200, 206):
+                        raise AssetError(f"Download returned status {response.status_code}")
+
+                    # A 200 means the server ignored the range: start over
+                    mode = 'ab' if response.status_code == 206 else 'wb'
+                    with open(partial_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+                            self._count('bytes', len(chunk))
+
+                    expected = response.headers.get('Content-Range', '').rpartition('/')[2]
+                    if not expected.isdigit() or os.path.getsize(partial_path) >= int(expected):
+                        break
+            except AssetError:
+                raise
+            except Exception:
+                if attempt == self.max_resumes:
+                    raise
+
+        if expected_md5:
+            digest = hashlib.md5()
+            with open(partial_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    digest.update(chunk)
+            if digest.hexdigest() != expected_md5:
+                os.remove(partial_path)
+                raise AssetError("Downloaded asset failed its checksum")
+
+    def fetch(self, item_id, item_type="PSScene", asset_type=DEFAULT_ASSET_TYPE):
+        """Local path of the asset, downloading it only if it is not cached"""
+        key = self.cache.key(item_type, item_id, asset_type)
+        path = self.cache.get(key)
+        if path is not None:
+            self._count('cache_hits')
+            return path
+
+        asset = self.activate(item_type, item_id, asset_type)
+        self.download(asset['location'], self.cache.partial_path(key), asset.get('md5_digest'))
+        self._count('downloads')
+        return self.cache.commit(key)
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+
+def decode_asset(path, asset_type=DEFAULT_ASSET_TYPE):
+    """Read an asset file into (bands, geotransform, nodata)
+
+    GeoTIFFs need the optional rasterio package; .npz files (used by local
+    stand-in servers and pre-processed archives) are read with NumPy alone.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic.startswith(b'PK'):
+        with np.load(path) as archive:
+            names = [name for name in archive.files if name not in ('geotransform', 'nodata')]
+            bands = {name: archive[name] for name in names}
+            geotransform = tuple(float(v) for v in archive['geotransform'])
+            nodata = float(archive['nodata']) if 'nodata' in archive.files else None
+        return bands, geotransform, nodata
+
+    if magic in (b'II*\x00', b'MM\x00*'):
+        try:
+            import rasterio
+            from rasterio.warp import Resampling, calculate_default_transform, reproject
+        except ImportError:
+            raise AssetError("Decoding GeoTIFF assets requires the rasterio package")
+
+        with rasterio.open(path) as src:
+            names = ASSET_BANDS.get(asset_type) or tuple(f"b{i}" for i in range(1, src.count + 1))
+            if src.crs and src.crs.to_epsg() != 4326:
+                # Warp projected (UTM) scenes onto a north-up degree grid; pixels outside the footprint get nodata
+                t, width, height = calculate_default_transform(src.crs, 'EPSG:4326', src.width, src.height,
+                                                               *src.bounds)
+                nodata = 0 if src.nodata is None else src.nodata
+                bands = {}
+                for i, name in enumerate(names[:src.count]):
+                    band = np.full((height, width), nodata, dtype=src.dtypes[i])
+                    reproject(rasterio.band(src, i + 1), band, src_transform=src.transform, src_crs=src.crs,
+                              dst_transform=t, dst_crs='EPSG:4326', dst_nodata=nodata,
+                              resampling=Resampling.nearest)
+                    bands[name] = band
+                return bands, (t.c, t.a, 0, t.f, 0, t.e), nodata
+
+            t = src.transform
+            bands = {name: src.read(i + 1) for i, name in enumerate(names[:src.count])}
+            return bands, (t.c, t.a, 0, t.f, 0, t.e), src.nodata
+
+    raise AssetError(f"Unrecognised asset format in {os.path.basename(path)}")
+
+
+def decode_into_store(path, scene_id, store_root, asset_type=DEFAULT_ASSET_TYPE):
+    """Worker entry point: decode one asset and write it into the tile store"""
+    bands, geotransform, nodata = decode_asset(path, asset_type)
+    TileStore(root=store_root).write_scene(scene_id, bands, geotransform, nodata=nodata)
+    return scene_id
+
+
+class AssetPipeline:
+    """Download, decode and measure NDVI for a set of Planet scenes"""
+
+    def __init__(self, downloader, store=None, download_workers=4, decode_workers=None,
+                 asset_type=DEFAULT_ASSET_TYPE):
+        self.downloader = downloader
+        self.store = store or TileStore()
+        self.asset_type = asset_type
+        self._downloads = ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="cludo-asset")
+        self._decode_workers = decode_workers or max(1, (os.cpu_count() or 2) - 1)
+        self._decoders = None
+
+    def _decoder_pool(self):
+        # Spawned workers only import the side-effect-free decode path
+        if self._decoders is None:
+            self._decoders = ProcessPoolExecutor(
+                max_workers=self._decode_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._decoders
+
+    def scene_id(self, item_id):
+        return f"{item_id}_{self.asset_type}"
+
+    def ensure_scenes(self, item_ids, item_type="PSScene"):
+        """Make sure every scene is in the tile store; returns {item_id: error} for failures"""
+        missing = [item_id for item_id in item_ids if not self.store.has_scene(self.scene_id(item_id))]
+        errors = {}
+
+        paths = {}
+        futures = {
+            item_id: self._downloads.submit(self.downloader.fetch, item_id, item_type, self.asset_type)
+            for item_id in missing
+        }
+        for item_id, future in futures.items():
+            try:
+                paths[item_id] = future.result()
+            except Exception as e:
+                errors[item_id] = str(e)
+
+        decodes = {
+            item_id: self._decoder_pool().submit(
+                decode_into_store, path, self.scene_id(item_id), self.store.root, self.asset_type
+            )
+            for item_id, path in paths.items()
+        }
+        for item_id, future in decodes.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors[item_id] = str(e)
+        return errors
+
+    def measure(self, item_ids, lat, lon, buffer_m=250, item_type="PSScene"):
+        """NDVI zonal statistics around (lat, lon) for every scene that could be obtained"""
+        self.ensure_scenes(item_ids, item_type)
+
+        results = {}
+        for item_id in item_ids:
+            scene_id = self.scene_id(item_id)
+            if not self.store.has_scene(scene_id):
+                continue
+            window = self.store.read_window(scene_id, lat, lon, buffer_m, bands=['red', 'nir'])
+            if window is not None:
+                results[item_id] = window.statistics()['ndvi']
+
+        # Decode workers never evict, so trim the store here, sparing the scenes just measured
+        self.store.evict(keep=[self.scene_id(item_id) for item_id in item_ids])
+        return results
+
+    def shutdown(self):
+        self._downloads.shutdown(wait=False)
+        if self._decoders is not None:
+            self._decoders.shutdown(wait=False)
@@ -0,0 +1,361 @@
+"""
+Headless batch audit runner.
+
+Runs the full audit pipeline (Planet fetch, processing or simulated data,
+Gemini or fallback analysis) for every site in a CSV or GeoJSON file on a
+process pool. Calls to each external API are capped by cross-process
+semaphores; each worker runs in the rate limiter's batch lane with an equal
+share of every provider quota. With --weather, the shared weather cache is
+warmed for every site before the workers start. Every finished site is
+appended to a JSONL checkpoint so an interrupted run resumes where it
+stopped.
+
+Usage:
+    python batch_audit.py sites.csv --checkpoint results.jsonl --workers 8
+
+CSV columns: lat, lon, start_date, end_date and optionally id, description.
+GeoJSON: Point features with start_date/end_date (and optional id,
+description) in their properties.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+DEFAULT_DESCRIPTION = "Batch environmental audit"
+RISK_LEVELS = ('low', 'medium', 'high', 'critical')
+IN_FLIGHT_PER_WORKER = 4
+
+# Per-process state set up by the pool initializer
+_pipeline = None
+_limits = {}
+_fallback_only = False
+_gemini_min_risk = 'low'
+_with_weather = False
+
+
+def site_id(site):
+    """Stable id for a site, used as the checkpoint key"""
+    if site.get('id'):
+        return str(site['id'])
+    raw = f"{site['lat']:.6f},{site['lon']:.6f},{site['start_date']},{site['end_date']}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _parse_site(raw, default_description):
+    site = {
+        'id': raw.get('id') or None,
+        'lat': float(raw['lat']),
+        'lon': float(raw['lon']),
+        'start_date': str(raw['start_date'])[:10],
+        'end_date': str(raw['end_date'])[:10],
+        'description': raw.get('description') or default_description,
+    }
+    site['id'] = site_id(site)
+    return site
+
+
+def _invalid_site(raw, row, error):
+    """Error result for a row that cannot be parsed, so the run records it and carries on"""
+    raw_id = raw.get('id') if isinstance(raw, dict) else None
+    return {
+        'id': str(raw_id) if raw_id else f"row-{row}",
+        'row': row,
+        'status': 'error',
+        'error': f"Invalid site: {type(error).__name__}: {error}",
+    }
+
+
+def load_sites(path, default_description=DEFAULT_DESCRIPTION):
+    """Yield sites from a CSV or GeoJSON file; malformed rows are yielded as error results"""
+    if path.lower().endswith(('.geojson', '.json')):
+        with open(path) as f:
+            collection = json.load(f)
+        for row, feature in enumerate(collection.get('features', []), start=1):
+            try:
+                lon, lat = feature['geometry']['coordinates'][:2]
+                yield _parse_site({**feature.get('properties', {}), 'lat': lat, 'lon': lon}, default_description)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                yield _invalid_site(feature.get('properties') if isinstance(feature, dict) else None, row, e)
+    else:
+        with open(path, newline='') as f:
+            # Row numbers count the header as row 1, as a spreadsheet shows them
+            for row, raw in enumerate(csv.DictReader(f), start=2):
+                try:
+                    yield _parse_site(raw, default_description)
+                except (KeyError, TypeError, ValueError) as e:
+                    yield _invalid_site(raw, row, e)
+
+
+def load_checkpoint(path):
+    """Ids of sites that already finished successfully"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line
+                continue
+            if record.get('status') == 'ok':
+                done.add(record['id'])
+    return done
+
+
+def _end_partial_line(path):
+    """Terminate a last line cut off by a crash so appended records start on a line of their own"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def _init_worker(limits, fallback_only, gemini_min_risk='low', rate_share=1.0, with_weather=False):
+    """Import the pipeline engine (not the Streamlit page) once per worker process"""
+    global _pipeline, _limits, _fallback_only, _gemini_min_risk, _with_weather
+    import engine
+    import rate_limit
+
+    rate_limit.configure(share=rate_share, default_lane='batch')
+
+    _pipeline = engine
+    _limits = limits
+    _fallback_only = fallback_only
+    _gemini_min_risk = gemini_min_risk
+    _with_weather = with_weather
+
+
+def _observe(site):
+    """Satellite observations for one site and where they came from"""
+    start_dt = datetime.strptime(site['start_date'], '%Y-%m-%d')
+    end_dt = datetime.strptime(site['end_date'], '%Y-%m-%d')
+
+    with _limits['planet']:
+        features = _pipeline.fetch_real_satellite_data(site['lat'], site['lon'], start_dt, end_dt)
+
+    satellite_data = None
+    if features:
+        satellite_data = _pipeline.process_real_satellite_data(features, start_dt, end_dt)
+    if satellite_data:
+        return satellite_data, 'real_satellite'
+    return _pipeline.generate_mock_satellite_data(start_dt, end_dt, site['lat'], site['lon']), 'simulated'
+
+
+def _weather_summary(weather):
+    """Temperature, humidity and conditions from an OpenWeather response"""
+    if not weather:
+        return None
+    return {
+        'temp_c': weather.get('main', {}).get('temp'),
+        'humidity': weather.get('main', {}).get('humidity'),
+        'conditions': (weather.get('weather') or [{}])[0].get('description'),
+    }
+
+
+def _analyze(observed):
+    """{site id: analysis}, packing several sites into one Gemini request
+
+    Every site is first triaged with the vectorized trend engine; only sites
+    at or above the minimum risk level are sent to Gemini.
+    """
+    if not observed:
+        return {}
+    triage = _pipeline.generate_fallback_analyses([o['ndvi_data'] for o in observed])
+    analyses = {o['id']: analysis for o, analysis in zip(observed, triage)}
+    if _fallback_only:
+        return analyses
+
+    threshold = RISK_LEVELS.index(_gemini_min_risk)
+    escalated = [o for o, analysis in zip(observed, triage) if RISK_LEVELS.index(analysis['riskLevel']) >= threshold]
+    if not escalated:
+        return analyses
+    with _limits['gemini']:
+        if len(escalated) == 1:
+            o = escalated[0]
+            analyses[o['id']] = _pipeline.analyze_with_gemini(o['ndvi_data'], o['location'], o['description'])
+        else:
+            analyses.update(_pipeline.analyze_sites_with_gemini(escalated))
+    return analyses
+
+
+def audit_group(sites):
+    """Run fetch and process for each site, then analyze the group with one Gemini request"""
+    started = time.perf_counter()
+    records, observed = [], []
+
+    for site in sites:
+        try:
+            satellite_data, source = _observe(site)
+            observed.append({
+                'id': site['id'],
+                'ndvi_data': satellite_data,
+                'location': {'lat': site['lat'], 'lon': site['lon']},
+                'description': site['description'],
+                'source': source,
+            })
+        except Exception as e:
+            records.append({**site, 'status': 'error', 'error': str(e)})
+
+    by_id = {site['id']: site for site in sites}
+    try:
+        analyses = _analyze(observed)
+    except Exception as e:
+        records.extend({**by_id[o['id']], 'status': 'error', 'error': str(e)} for o in observed)
+        observed = []
+
+    for o in observed:
+        record = {
+            **by_id[o['id']],
+            'status': 'ok',
+            'source': o['source'],
+            'observations': len(o['ndvi_data']),
+            'analysis': analyses[o['id']],
+        }
+        if _with_weather:
+            # Served from the weather cache warmed by run_batch
+            record['weather'] = _weather_summary(_pipeline.fetch_weather_data(o['location']['lat'], o['location']['lon']))
+        records.append(record)
+
+    elapsed = round(time.perf_counter() - started, 3)
+    return [{**record, 'elapsed': elapsed} for record in records]
+
+
+def audit_site(site):
+    """Run fetch, process and analyze for one site inside a worker"""
+    return audit_group([site])[0]
+
+
+def run_batch(sites, checkpoint, workers=4, planet_concurrency=2, gemini_concurrency=1,
+              fallback_only=False, progress=None, sites_per_request=1, gemini_min_risk='low', weather=False):
+    """Audit every site not already in the checkpoint; returns (completed, failed, skipped)
+
+    With sites_per_request > 1, consecutive sites are analyzed together in a
+    single Gemini request that returns one verdict per site. Sites whose
+    rule-based risk is below gemini_min_risk keep that verdict and never
+    reach Gemini. With weather, every record gets the current weather; the
+    site list is read up front so the weather cache can be warmed for all
+    pending sites at once.
+    """
+    done = load_checkpoint(checkpoint)
+    if weather:
+        import engine
+
+        sites = list(sites)
+        engine.warm_weather_cache([(site['lat'], site['lon']) for site in sites
+                                   if site.get('status') != 'error' and site['id'] not in done])
+    context = multiprocessing.get_context('spawn')
+    limits = {
+        'planet': context.BoundedSemaphore(planet_concurrency),
+        'gemini': context.BoundedSemaphore(gemini_concurrency),
+    }
+    completed = failed = skipped = 0
+    _end_partial_line(checkpoint)
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+
+    with open(checkpoint, 'a') as out, ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker,
+        initargs=(limits, fallback_only, gemini_min_risk, 1.0 / workers, weather)
+    ) as pool:
+        pending = set()
+
+        def write(record):
+            nonlocal completed, failed
+            out.write(json.dumps(record, default=str) + "\n")
+            if record['status'] == 'ok':
+                completed += 1
+            else:
+                failed += 1
+            if progress:
+                progress(record, completed, failed, skipped)
+
+        def drain(block_until):
+            finished, still_pending = wait(pending, return_when=block_until)
+            for future in finished:
+                for record in future.result():
+                    write(record)
+            out.flush()
+            return still_pending
+
+        def submit(group):
+            nonlocal pending
+            # Keep a bounded window of submitted work so huge site lists stream through
+            if len(pending) >= max_in_flight:
+                pending = drain(FIRST_COMPLETED)
+            pending.add(pool.submit(audit_group, group))
+
+        group = []
+        for site in sites:
+            if site.get('status') == 'error':
+                # A malformed row fails on its own instead of stopping the run
+                write(site)
+                continue
+            if site['id'] in done:
+                skipped += 1
+                continue
+            group.append(site)
+            if len(group) >= sites_per_request:
+                submit(group)
+                group = []
+        if group:
+            submit(group)
+
+        while pending:
+            pending = drain(FIRST_COMPLETED)
+
+    return completed, failed, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run CLUDO satellite audits for a list of sites")
+    parser.add_argument("sites", help="CSV or GeoJSON file of sites")
+    parser.add_argument("--checkpoint", default="batch_results.jsonl", help="JSONL results file, also used to resume")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--planet-concurrency", type=int, default=2, help="Concurrent Planet searches across workers")
+    parser.add_argument("--gemini-concurrency", type=int, default=1, help="Concurrent Gemini calls across workers")
+    parser.add_argument("--description", default=DEFAULT_DESCRIPTION, help="Issue description for sites without one")
+    parser.add_argument("--fallback-only", action="store_true", help="Skip Gemini and use the fallback analysis")
+    parser.add_argument("--sites-per-request", type=int, default=1, help="Sites analyzed together in one Gemini request")
+    parser.add_argument("--gemini-min-risk", choices=RISK_LEVELS, default='low',
+                        help="Only send sites the rule-based triage rates at least this risky to Gemini")
+    parser.add_argument("--weather", action="store_true",
+                        help="Add current weather to each record, warming the shared weather cache first")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+
+    def report(record, completed, failed, skipped):
+        status = record['analysis']['riskLevel'] if record['status'] == 'ok' else f"error: {record['error']}"
+        where = f"({record['lat']:.4f}, {record['lon']:.4f})" if 'lat' in record else f"(row {record.get('row')})"
+        print(f"[{completed + failed}] {record['id']} {where} → {status}", flush=True)
+
+    completed, failed, skipped = run_batch(
+        load_sites(args.sites, args.description),
+        args.checkpoint,
+        workers=args.workers,
+        planet_concurrency=args.planet_concurrency,
+        gemini_concurrency=args.gemini_concurrency,
+        fallback_only=args.fallback_only,
+        progress=report,
+        sites_per_request=max(1, args.sites_per_request),
+        gemini_min_risk=args.gemini_min_risk,
+        weather=args.weather
+    )
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {completed} audited, {failed} failed, {skipped} already in checkpoint ({elapsed:.1f}s)")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
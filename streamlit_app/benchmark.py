@@ -0,0 +1,327 @@
+"""
+Offline benchmark of the audit pipeline.
+
+Starts local stand-ins for Planet, OpenWeather, EONET and Gemini
+(stub_servers.py), points the pipeline engine at them and runs its real
+functions for a set of distinct sites, stage by stage:
+
+- import:  cold `import engine` in fresh interpreters, which must stay under
+           the import budget without loading requests, pandas, plotly or
+           the Gemini SDK
+- fetch:   fetch_all() over satellite, weather and disaster sources
+- process: process_real_satellite_data() (simulated data when Planet failed)
+- analyze: analyze_with_gemini() against the streamed Gemini stub
+- render:  ndvi_figure() + highlighted(), validated and serialized the way
+           st.plotly_chart does
+
+Each stage reports throughput and p50/p95/p99 latency. A saved baseline is
+compared against every run and regressions beyond the tolerance fail it. A
+stage with no successful runs, or with more errors than the baseline (any,
+without one), fails the run too.
+
+Usage:
+    python benchmark.py                          # run and compare with the baseline
+    python benchmark.py --save-baseline          # record a new baseline
+    python benchmark.py --set gemini.latency_ms=1500 --set planet.size=2000 --set planet.error_rate=0.1
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from stub_servers import DEFAULT_SETTINGS, StubGeminiModel, start_stub_servers, stub_environment
+
+STAGES = ('import', 'fetch', 'process', 'analyze', 'render')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_ITERATIONS = 30
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TOLERANCE = 0.25        # allowed relative slowdown of p50/p95 and drop in throughput
+DEFAULT_MIN_DELTA_MS = 5        # slowdowns smaller than this are noise, whatever their ratio
+DEFAULT_IMPORT_BUDGET_MS = 300  # p50 of a cold `import engine`
+IMPORT_RUNS = 5
+LAZY_MODULES = ('requests', 'pandas', 'plotly', 'google.generativeai')
+AUDIT_DAYS = 730
+
+
+def parse_settings(assignments):
+    """{provider: {knob: value}} from 'provider.knob=value' strings"""
+    settings = {}
+    for assignment in assignments or []:
+        target, _, value = assignment.partition('=')
+        provider, _, knob = target.partition('.')
+        if provider not in DEFAULT_SETTINGS or not knob or not value:
+            raise ValueError(f"Expected provider.knob=value with provider in {', '.join(DEFAULT_SETTINGS)}, got {assignment!r}")
+        settings.setdefault(provider, {})[knob] = float(value) if '.' in value else int(value)
+    return settings
+
+
+def benchmark_sites(count):
+    """Distinct audit sites (each in its own cache cell) with a two-year window"""
+    end = datetime(2024, 6, 30)
+    start = end - timedelta(days=AUDIT_DAYS)
+    return [{'lat': -3.0 - 0.011 * i, 'lon': -60.0 + 0.013 * i, 'start': start, 'end': end} for i in range(count)]
+
+
+def load_pipeline(servers):
+    """Import the engine configured against the stubs, with Gemini models talking to the stub"""
+    os.environ.update(stub_environment(servers))
+    os.environ.setdefault('CLUDO_CACHE_DIR', tempfile.mkdtemp(prefix="cludo-bench-"))
+
+    import engine
+
+    gemini_url = servers['gemini'].url
+    engine.configure(model_factory=lambda name: StubGeminiModel(gemini_url, name))
+    return engine
+
+
+_IMPORT_PROBE = f"""
+import sys, time
+started = time.perf_counter()
+import engine
+elapsed = time.perf_counter() - started
+print(elapsed, *[name for name in {LAZY_MODULES!r} if name in sys.modules])
+"""
+
+
+def measure_import(runs=IMPORT_RUNS):
+    """(stats, eagerly loaded heavy modules) for a cold `import engine` in fresh interpreters"""
+    samples, loaded = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        samples.append(float(output[0]))
+        loaded.update(output[1:])
+    stats = latency_stats(samples, sum(samples))
+    stats['errors'] = 0
+    return stats, sorted(loaded)
+
+
+def latency_stats(samples, wall_time):
+    """Throughput over the stage's wall time and latency percentiles in milliseconds"""
+    if not samples:
+        return {'count': 0, 'throughput': 0.0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {
+        'count': len(samples),
+        'throughput': round(len(samples) / wall_time, 3) if wall_time > 0 else 0.0,
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+    }
+
+
+def run_stage(fn, items, concurrency):
+    """Apply fn to every item on a thread pool; returns (results, stats)"""
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            return fn(item), time.perf_counter() - started, None
+        except Exception as e:
+            return None, time.perf_counter() - started, e
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, items))
+    wall_time = time.perf_counter() - started
+
+    samples = [elapsed for _, elapsed, error in outcomes if error is None]
+    stats = latency_stats(samples, wall_time)
+    stats['errors'] = sum(error is not None for _, _, error in outcomes)
+    return [result for result, _, _ in outcomes], stats
+
+
+def run_benchmark(pipeline, sites, concurrency=DEFAULT_CONCURRENCY):
+    """Run every stage over all sites; returns {stage: stats}"""
+    import plotly.io as pio
+    from plotly.tools import return_figure_from_figure_or_data
+
+    from charts import highlighted, ndvi_figure
+    from fetch_orchestrator import fetch_all
+
+    def fetch(site):
+        fetched = fetch_all({
+            'satellite': lambda: pipeline.fetch_real_satellite_data(site['lat'], site['lon'], site['start'], site['end']),
+            'weather': lambda: pipeline.fetch_weather_data(site['lat'], site['lon']),
+            'disasters': lambda: pipeline.fetch_disaster_data(site['lat'], site['lon']),
+        })
+        if fetched.timed_out or fetched.errors:
+            raise RuntimeError(f"timed out: {fetched.timed_out}, errors: {fetched.errors}")
+        return fetched
+
+    def process(item):
+        site, fetched = item
+        features = fetched.get('satellite') if fetched else None
+        series = pipeline.process_real_satellite_data(features, site['start'], site['end']) if features else None
+        return series or pipeline.generate_mock_satellite_data(site['start'], site['end'], site['lat'], site['lon'])
+
+    def analyze(item):
+        site, series = item
+        analysis = pipeline.analyze_with_gemini(series, {'lat': site['lat'], 'lon': site['lon']}, "Benchmark audit")
+        if 'servedFromCache' not in analysis:
+            raise RuntimeError("Gemini failed, fallback analysis used")
+        return analysis
+
+    def render(series):
+        idx = len(series) // 2
+        figure = ndvi_figure(series, pipeline.CHART_POINT_BUDGET)
+        with highlighted(figure, series.dates[idx], float(series.ndvi[idx])) as chart:
+            return pio.to_json(return_figure_from_figure_or_data(chart, validate_figure=True), validate=False)
+
+    report = {}
+    fetched, report['fetch'] = run_stage(fetch, sites, concurrency)
+    series, report['process'] = run_stage(process, list(zip(sites, fetched)), concurrency)
+    _, report['analyze'] = run_stage(analyze, list(zip(sites, series)), concurrency)
+    _, report['render'] = run_stage(render, [s for s in series if s is not None], concurrency)
+    return report
+
+
+def check_import(report, budget_ms=DEFAULT_IMPORT_BUDGET_MS):
+    """Import-time problems that fail a run even without a baseline"""
+    problems = []
+    stats = report['stages'].get('import')
+    if stats and stats['p50_ms'] > budget_ms:
+        problems.append(f"import: p50 {stats['p50_ms']:.1f} ms is over the {budget_ms:.0f} ms budget")
+    if report.get('eager_imports'):
+        problems.append(f"import: engine loads {', '.join(report['eager_imports'])} at import time")
+    return problems
+
+
+def check_errors(report, baseline=None):
+    """Stages that never succeeded or failed more often than in the baseline (than never, without one)"""
+    problems = []
+    for stage, stats in report['stages'].items():
+        if not stats['count']:
+            problems.append(f"{stage}: no successful runs")
+            continue
+        allowed = ((baseline or {}).get('stages', {}).get(stage) or {}).get('errors', 0)
+        if stats['errors'] > allowed:
+            problems.append(f"{stage}: {stats['errors']} errors (baseline {allowed})")
+    return problems
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """Human-readable regressions of `report` against `baseline` (empty when none)"""
+    regressions = []
+    for stage, base in baseline['stages'].items():
+        current = report['stages'].get(stage)
+        if current is None or not current['count']:
+            regressions.append(f"{stage}: no successful runs")
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if base.get(metric) is None:
+                continue
+            limit = max(base[metric] * (1 + tolerance), base[metric] + min_delta_ms)
+            if current[metric] > limit:
+                regressions.append(f"{stage}: {metric} {current[metric]:.1f} > {limit:.1f} (baseline {base[metric]:.1f})")
+        # Like latency, throughput only regresses when time per site grows by more than min_delta_ms
+        if (base.get('throughput') and current['throughput'] < base['throughput'] / (1 + tolerance)
+                and 1000 / max(current['throughput'], 1e-9) - 1000 / base['throughput'] > min_delta_ms):
+            regressions.append(f"{stage}: throughput {current['throughput']:.2f}/s < baseline {base['throughput']:.2f}/s")
+    return regressions
+
+
+def format_report(report):
+    lines = [f"{'stage':<10}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"]
+    for stage in STAGES:
+        stats = report['stages'][stage]
+        cells = [f"{stats[m]:>10.1f}" if stats[m] is not None else f"{'-':>10}" for m in ('p50_ms', 'p95_ms', 'p99_ms')]
+        lines.append(f"{stage:<10}{stats['throughput']:>10.2f}{''.join(cells)}{stats['errors']:>8}")
+    requests = ", ".join(f"{name} {count['requests']} ({count['errors']} failed, {count.get('throttled', 0)} throttled)"
+                         for name, count in report['stub_requests'].items())
+    lines.append(f"Stub requests: {requests}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CLUDO pipeline against local provider stubs")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="Sites run through every stage")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Sites processed at once")
+    parser.add_argument("--set", dest="settings", action="append", metavar="PROVIDER.KNOB=VALUE",
+                        help="Override a stub setting (latency_ms, jitter_ms, error_rate, size, chunk_interval_ms)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for stub payloads and injected failures")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS, help="Ignore slowdowns below this")
+    parser.add_argument("--import-budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS,
+                        help="Fail when a cold `import engine` takes longer (p50)")
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = parse_settings(args.settings)
+    except ValueError as e:
+        parser.error(str(e))
+
+    import_stats, eager_imports = measure_import()
+    servers = start_stub_servers(settings, seed=args.seed)
+    try:
+        pipeline = load_pipeline(servers)
+        # One untimed site so imports, the model probe and the first EONET snapshot are not measured
+        run_benchmark(pipeline, benchmark_sites(args.iterations + 1)[-1:], concurrency=1)
+        for server in servers.values():
+            server.reset_stats()
+
+        report = {
+            'config': {
+                'iterations': args.iterations,
+                'concurrency': args.concurrency,
+                'seed': args.seed,
+                'stubs': {name: {**DEFAULT_SETTINGS[name], **settings.get(name, {})} for name in servers},
+            },
+            'stages': {'import': import_stats, **run_benchmark(pipeline, benchmark_sites(args.iterations), args.concurrency)},
+            'stub_requests': {name: dict(server.stats) for name, server in servers.items()},
+            'eager_imports': eager_imports,
+        }
+    finally:
+        for server in servers.values():
+            server.stop()
+
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    problems = check_import(report, args.import_budget_ms)
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['config'] != report['config']:
+            print("Baseline was recorded with different settings; re-run with the same options or save a new baseline")
+            return 2
+    # A failing stage can look faster than a working one, so errors fail the run on their own
+    problems += check_errors(report, baseline)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+
+    if args.save_baseline:
+        if problems:
+            print("Not saving a baseline with errors or over the import budget")
+            return 1
+        with open(args.baseline, 'w') as f:
+            json.dump({'config': report['config'], 'stages': report['stages']}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("No baseline yet; record one with --save-baseline")
+        return 1 if problems else 0
+
+    regressions = problems + [r for r in compare(report, baseline, args.tolerance, args.min_delta_ms) if r not in problems]
+    for regression in regressions[len(problems):]:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
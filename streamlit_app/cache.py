@@ -0,0 +1,156 @@
+"""
+Two-tier TTL cache: an in-memory LRU in front of an on-disk SQLite store.
+
+Values must be JSON-serializable. The disk tier survives Streamlit restarts and
+is shared by every process pointing at the same cache directory; each
+namespace has its own TTL, entry limit and byte budget.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv("CLUDO_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_BYTES = 64 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed);
+"""
+
+
+class TieredCache:
+    """Memory LRU + SQLite cache with TTL, size-based eviction and counters"""
+
+    def __init__(self, namespace, path=None, ttl=DEFAULT_TTL, max_memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 max_disk_bytes=DEFAULT_DISK_BYTES, clock=time.time):
+        self.namespace = namespace
+        self.path = path or os.path.join(CACHE_DIR, "cache.sqlite3")
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self.counters = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _expired(self, created):
+        return self.ttl is not None and self._clock() - created > self.ttl
+
+    def get(self, key, default=None):
+        """Return the cached value, or `default` on a miss or an expired entry"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self.counters['hits'] += 1
+                    self.counters['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, created FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+            if row is None:
+                self.counters['misses'] += 1
+                return default
+
+            if self._expired(row[1]):
+                self._db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._db.commit()
+                self.counters['expirations'] += 1
+                self.counters['misses'] += 1
+                return default
+
+            value = json.loads(row[0])
+            self._db.execute(
+                "UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?",
+                (self._clock(), self.namespace, key)
+            )
+            self._db.commit()
+            self._remember(key, row[1], value)
+            self.counters['hits'] += 1
+            self.counters['disk_hits'] += 1
+            return value
+
+    def set(self, key, value):
+        """Store a value in both tiers"""
+        payload = json.dumps(value, separators=(',', ':'), default=str)
+        now = self._clock()
+        with self._lock:
+            self._remember(key, now, value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, len(payload), now, now)
+            )
+            self._evict_disk()
+            self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+            self._db.commit()
+
+    def _remember(self, key, created, value):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _evict_disk(self):
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        # Drop least recently used entries until the namespace fits its byte budget
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries WHERE namespace = ? ORDER BY accessed", (self.namespace,)
+        ).fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            self._memory.pop(key, None)
+            total -= size
+            self.counters['evictions'] += 1
+
+    def stats(self):
+        """Counters plus current tier sizes"""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+            return {**self.counters, 'memory_entries': len(self._memory), 'disk_entries': entries, 'disk_bytes': size}
@@ -0,0 +1,170 @@
+"""
+Memoized NDVI chart construction.
+
+Long series are reduced with Largest-Triangle-Three-Buckets to a point
+budget, and the resulting plotly Figure is built once per dataset and cached
+by a content hash of the series. The cached Figure is already validated, so
+st.plotly_chart only serializes it; moving through time just moves the
+one-point highlight trace it carries instead of rebuilding the figure.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+DEFAULT_POINT_BUDGET = 500
+MAX_CACHED_FIGURES = 32
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+# Cached figures are shared by every session; their highlight is moved and rendered under this lock
+_highlight_lock = threading.Lock()
+
+
+def lttb(x, y, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y)
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(int) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return selected
+
+
+def series_fingerprint(series, max_points):
+    """Content hash of the plotted data and the point budget"""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(series.dates).view(np.int64).tobytes())
+    digest.update(np.ascontiguousarray(series.ndvi).tobytes())
+    digest.update(str(max_points).encode())
+    return digest.hexdigest()
+
+
+def _build_ndvi_figure(series, max_points):
+    import plotly.graph_objects as go
+
+    finite = np.isfinite(series.ndvi)
+    dates, values = series.dates[finite], series.ndvi[finite]
+    keep = lttb(dates.view(np.int64), values, max_points)
+    title = "NDVI Trend Over Time"
+    if len(keep) < len(dates):
+        title += f" ({len(keep)} of {len(dates)} observations shown)"
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=dates[keep],
+        y=values[keep],
+        mode='lines+markers',
+        name='NDVI',
+        line=dict(color='#11998e', width=3),
+        marker=dict(size=8 if len(keep) <= 100 else 4)
+    ))
+    # Highlight of the selected observation; highlighted() moves it
+    fig.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='markers',
+        name="Selected",
+        marker=dict(size=16, color='#764ba2', line=dict(width=2, color='white')),
+        hoverinfo='skip',
+        showlegend=False
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis_title="NDVI Value",
+        hovermode='x unified',
+        height=400
+    )
+    return fig
+
+
+def ndvi_figure(series, max_points=DEFAULT_POINT_BUDGET):
+    """plotly Figure for a series, built once per dataset; only change it through highlighted()"""
+    key = series_fingerprint(series, max_points)
+    with _lock:
+        figure = _figures.get(key)
+        if figure is not None:
+            _figures.move_to_end(key)
+            return figure
+
+    figure = _build_ndvi_figure(series, max_points)
+    with _lock:
+        _figures[key] = figure
+        while len(_figures) > MAX_CACHED_FIGURES:
+            _figures.popitem(last=False)
+    return figure
+
+
+@contextmanager
+def highlighted(figure, date, value):
+    """The cached figure with its highlight at (date, value), held for the block so it can be rendered
+
+    Only the highlight trace's two coordinates change, so a slider move costs
+    a serialization of the already-validated figure and no rebuild.
+    """
+    with _highlight_lock:
+        marker = figure.data[-1]
+        marker.x, marker.y = [date], [value]
+        yield figure
+
+
+def waterfall_figure(trace):
+    """Horizontal bar per span of a trace dict (Tracer trace.to_dict()), children under their parents"""
+    import plotly.graph_objects as go
+
+    children = {}
+    for span in trace['spans']:
+        children.setdefault(span['parent'], []).append(span)
+
+    rows = []
+
+    def visit(parent, depth):
+        for span in sorted(children.get(parent, []), key=lambda s: s['start']):
+            rows.append((depth, span))
+            visit(span['id'], depth + 1)
+    visit(None, 0)
+
+    labels = [f"{'  ' * depth}{span['name']}" for depth, span in rows]
+    fig = go.Figure(go.Bar(
+        y=labels,
+        x=[span['duration'] * 1000 for _, span in rows],
+        base=[span['start'] * 1000 for _, span in rows],
+        orientation='h',
+        marker_color=['#f5576c' if span['error'] else '#667eea' for _, span in rows],
+        hovertemplate="%{y}: %{x:.0f} ms<extra></extra>",
+    ))
+    fig.update_layout(
+        title=f"{trace['name']}: {trace['duration'] * 1000:.0f} ms",
+        xaxis_title="ms since start",
+        yaxis=dict(autorange='reversed'),
+        height=max(200, 28 * len(rows) + 80),
+        margin=dict(l=10, r=10, t=40, b=30),
+        showlegend=False
+    )
+    return fig.to_plotly_json()
@@ -0,0 +1,112 @@
+"""
+Scene compositing for satellite series.
+
+Overlapping PSScene strips give many observations of the same place on the
+same day. Compositing groups observations by period (day, ISO week or
+month) and merges each group into one cloud-weighted observation, so the
+chart, the trend engine and the prompt work on one point per period instead
+of one per scene.
+
+Timestamps are parsed for the whole batch at once with NumPy; strings that
+are not ISO-8601 become NaT and are dropped rather than given a made-up
+date.
+"""
+
+import numpy as np
+
+from timeseries import TIME_UNIT, SatelliteSeries
+
+PERIODS = ('day', 'week', 'month')
+MIN_WEIGHT = 1e-3       # fully clouded scenes still count when a period has nothing better
+ISO_PREFIX = 19         # 'YYYY-MM-DDTHH:MM:SS'; fractions and the zone suffix are dropped (Planet uses UTC)
+
+# How each column of a group is combined; anything not listed is a weighted mean
+_REDUCERS = {
+    'ndvi_min': np.fmin,
+    'ndvi_max': np.fmax,
+}
+
+
+def parse_timestamps(values):
+    """datetime64[s] array from ISO-8601 strings; NaT where a value cannot be parsed"""
+    text = np.asarray(values, dtype=object)
+    prefixes = np.array([value if isinstance(value, str) else '' for value in text], dtype=f'U{ISO_PREFIX}')
+    try:
+        return prefixes.astype(TIME_UNIT)
+    except ValueError:
+        pass
+
+    # Some value is malformed: parse one by one so only that one becomes NaT
+    parsed = np.full(len(prefixes), np.datetime64('NaT'), dtype=TIME_UNIT)
+    for i, value in enumerate(prefixes):
+        try:
+            parsed[i] = np.datetime64(value, 's')
+        except ValueError:
+            continue
+    return parsed
+
+
+def period_start(dates, period='day'):
+    """Start of the day, ISO week (Monday) or month containing each date"""
+    if period == 'day':
+        return dates.astype('datetime64[D]').astype(TIME_UNIT)
+    if period == 'week':
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        # Day 0 (1970-01-01) was a Thursday
+        return ((days - (days + 3) % 7).astype('datetime64[D]')).astype(TIME_UNIT)
+    if period == 'month':
+        return dates.astype('datetime64[M]').astype(TIME_UNIT)
+    raise ValueError(f"Unknown composite period {period!r}, expected one of {', '.join(PERIODS)}")
+
+
+def scene_weights(cloud_cover, clear_fraction):
+    """Compositing weight per scene: clear share of the scene times its cloud-free share"""
+    cloud_cover = np.nan_to_num(np.asarray(cloud_cover, dtype=np.float64), nan=0.5)
+    clear_fraction = np.asarray(clear_fraction, dtype=np.float64)
+    clear_fraction = np.where(np.isnan(clear_fraction), 1 - cloud_cover, clear_fraction)
+    return np.maximum(np.clip(clear_fraction, 0, 1) * np.clip(1 - cloud_cover, 0, 1), MIN_WEIGHT)
+
+
+def composite(series, weights, period='day'):
+    """One observation per period: weighted means of every column (min/max for the NDVI extremes)
+
+    Scenes whose NDVI was measured on downloaded bands outrank estimated ones:
+    in a period with any measured scene, estimated scenes get no weight. The
+    result gains a `scenes` column with the number of scenes merged (summed
+    when the input already has one) and is sorted by date.
+    """
+    if len(series) == 0:
+        return series
+
+    keys = period_start(series.dates, period)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    weights = np.asarray(weights, dtype=np.float64)[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    groups = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(keys)]))
+
+    measured = series.columns.get('measured')
+    if measured is not None:
+        measured = measured[order]
+        group_measured = np.bincount(groups, weights=measured, minlength=len(starts)) > 0
+        weights = np.where(group_measured[groups] & ~measured, 0.0, weights)
+
+    columns = {'scenes': np.diff(np.r_[starts, len(keys)])}
+    for name, values in series.columns.items():
+        values = values[order]
+        if name == 'measured':
+            columns[name] = group_measured
+        elif name == 'scenes':
+            # Compositing composites again: the counts add up
+            columns[name] = np.add.reduceat(values, starts)
+        elif name in _REDUCERS:
+            columns[name] = _REDUCERS[name].reduceat(values, starts)
+        else:
+            finite = np.isfinite(values)
+            used = np.where(finite, weights, 0.0)
+            total = np.bincount(groups, weights=used, minlength=len(starts))
+            weighted = np.bincount(groups, weights=np.where(finite, values * used, 0.0), minlength=len(starts))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                columns[name] = np.where(total > 0, weighted / total, np.nan)
+
+    return SatelliteSeries(keys[starts], source=series.source, **columns)
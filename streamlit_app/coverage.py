@@ -0,0 +1,92 @@
+"""
+Date-interval bookkeeping for incremental Planet searches.
+
+For each location we remember which [gte, lte] day ranges have already been
+searched together with the scenes they returned. A new request only searches
+the uncovered gaps and merges the answers, deduplicated by item id.
+"""
+
+from datetime import date, timedelta
+
+ONE_DAY = timedelta(days=1)
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if hasattr(value, 'date') and callable(value.date):
+        return value.date()
+    return value
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping or touching inclusive day intervals"""
+    merged = []
+    for start, end in sorted((_as_date(s), _as_date(e)) for s, e in intervals):
+        if merged and start <= merged[-1][1] + ONE_DAY:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_intervals(covered, start, end):
+    """Inclusive day intervals inside [start, end] not yet covered"""
+    start, end = _as_date(start), _as_date(end)
+    gaps = []
+    cursor = start
+    for c_start, c_end in merge_intervals(covered):
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, c_start - ONE_DAY))
+        cursor = max(cursor, c_end + ONE_DAY)
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class SceneCoverage:
+    """Searched intervals plus the scenes found in them, for one location"""
+
+    def __init__(self, intervals=None, features=None):
+        self.intervals = merge_intervals(intervals or [])
+        self.features = dict(features or {})
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(data.get('intervals'), data.get('features'))
+
+    def to_dict(self):
+        return {
+            'intervals': [[s.isoformat(), e.isoformat()] for s, e in self.intervals],
+            'features': self.features,
+        }
+
+    def gaps(self, start, end):
+        return missing_intervals(self.intervals, start, end)
+
+    def add(self, start, end, features):
+        """Record a searched interval and merge its scenes by item id"""
+        self.add_features(features)
+        if _as_date(end) >= _as_date(start):
+            self.intervals = merge_intervals(self.intervals + [(start, end)])
+
+    def add_features(self, features):
+        """Merge scenes by item id without marking any range searched (e.g. from a search that failed part-way)"""
+        for feature in features:
+            self.features[feature.get('id') or feature.get('properties', {}).get('acquired')] = feature
+
+    def features_between(self, start, end):
+        """Stored scenes acquired inside [start, end]"""
+        low, high = _as_date(start).isoformat(), _as_date(end).isoformat()
+        return [
+            feature for feature in self.features.values()
+            if low <= feature.get('properties', {}).get('acquired', '')[:10] <= high
+        ]
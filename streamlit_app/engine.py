@@ -0,0 +1,685 @@
+"""
+Audit pipeline engine: fetch, process and analyze, without any UI.
+
+Importing this module has no side effects: no Streamlit calls, no secret
+lookups, no network and no heavy imports. API keys come from the environment
+or configure(); the shared caches, EONET catalog, asset pipeline, Gemini
+model registry, weather cache and analysis job queue are created on first
+use, and requests, the Gemini SDK, pandas and plotly are only imported by
+the code paths that need them. The Streamlit page, the batch workers and
+the benchmark all drive this module.
+
+Problems that fall back to simulated data or the rule-based analysis are
+reported through the warning handler (logging by default; the page shows
+them with st.warning), or attached to the job's notices when they happen
+inside a background audit job.
+"""
+
+import contextvars
+import heapq
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from analysis_stream import BATCH_RESPONSE_SCHEMA, generation_config, stream_analysis, validate_analysis
+from cache import TieredCache
+from compositing import composite, parse_timestamps, scene_weights
+from coverage import SceneCoverage
+from eonet_catalog import EONET_EVENTS_URL, EonetCatalog
+from fetch_orchestrator import fetch_all
+from geo import quantize_location
+from jobs import JobQueue
+from model_registry import ModelRegistry
+from ndvi_engine import ndvi, scene_statistics
+from planet_search import PLANET_SEARCH_URL, build_search_filter, iter_search_features
+from prompt_builder import analysis_cache_key, build_batch_prompt, build_site_prompt, parse_batch_response
+from rate_limit import RATE_LIMIT_RETRIES, get_limiter
+from synthetic import location_seed, observation_dates, synthesize_ndvi
+from timeseries import SatelliteSeries
+from tracing import bind, get_tracer, span, traced
+from trend_engine import analyze_trends, classify_risk, series_matrix
+from weather_cache import WeatherCache
+
+logger = logging.getLogger(__name__)
+
+# API keys; the Streamlit page overrides them from its secrets with configure()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+SATELLITE_API_KEY = os.getenv("SATELLITE_API_KEY", "your_planet_labs_api_key_here")
+WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "your_openweather_api_key_here")
+
+# Provider endpoints can be pointed elsewhere (e.g. the local stubs used by benchmark.py)
+WEATHER_API_URL = os.getenv("WEATHER_API_URL", "https://api.openweathermap.org/data/2.5/weather")
+
+# Planet quick-search results are cached per quantized location, with the date ranges already searched
+PLANET_CACHE_TTL = int(os.getenv("PLANET_CACHE_TTL", 24 * 60 * 60))
+PLANET_CACHE_MAX_BYTES = int(os.getenv("PLANET_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+SCENE_PROPERTIES = ('acquired', 'cloud_cover', 'clear_percent', 'item_type')
+
+# Simulated scenes: cadence, pixel patch around the audit point and share of cloud-masked pixels
+MOCK_CADENCE_DAYS = 30
+MOCK_PATCH_SIZE = 41
+MOCK_CLOUD_FRACTION = 0.03
+
+# Most points the NDVI chart sends to the browser (longer series are LTTB-downsampled)
+CHART_POINT_BUDGET = int(os.getenv("CHART_POINT_BUDGET", 500))
+
+# Planet search pagination and the per-analysis scene cap
+PLANET_SEARCH_URL = os.getenv("PLANET_SEARCH_URL", PLANET_SEARCH_URL)
+PLANET_PAGE_SIZE = int(os.getenv("PLANET_PAGE_SIZE", 250))
+PLANET_MAX_SCENES = int(os.getenv("PLANET_MAX_SCENES", 2000))
+
+# Scenes are merged into one cloud-weighted observation per day, week or month
+COMPOSITE_PERIOD = os.getenv("COMPOSITE_PERIOD", "day")
+
+# Optional download of analytic assets for measured NDVI (activation can take minutes)
+PLANET_DOWNLOAD_ASSETS = os.getenv("PLANET_DOWNLOAD_ASSETS", "").lower() in ("1", "true", "yes")
+PLANET_MAX_DOWNLOADS = int(os.getenv("PLANET_MAX_DOWNLOADS", 12))
+PLANET_ASSET_CACHE_BYTES = int(os.getenv("PLANET_ASSET_CACHE_BYTES", 20 * 1024 ** 3))
+PLANET_TILE_CACHE_BYTES = int(os.getenv("PLANET_TILE_CACHE_BYTES", 10 * 1024 ** 3))
+AUDIT_BUFFER_M = 250
+
+# Current weather is cached per geohash cell, shared by all sessions and refreshed in the background once stale
+WEATHER_CELL_PRECISION = int(os.getenv("WEATHER_CELL_PRECISION", 5))
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", 10 * 60))
+WEATHER_STALE_TTL = int(os.getenv("WEATHER_STALE_TTL", 60 * 60))
+
+# NASA EONET open events are refreshed in the background and queried locally
+EONET_EVENTS_URL = os.getenv("EONET_EVENTS_URL", EONET_EVENTS_URL)
+EONET_REFRESH_INTERVAL = int(os.getenv("EONET_REFRESH_INTERVAL", 15 * 60))
+EONET_INITIAL_WAIT = 4
+
+# Gemini prompts are compacted to a fixed input-token budget per site
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 1200))
+
+# Gemini verdicts are cached by content hash of model, site, issue and series; NDVI is rounded to
+# ANALYSIS_CACHE_PRECISION decimals for the key
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 60 * 60))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+ANALYSIS_CACHE_PRECISION = int(os.getenv("ANALYSIS_CACHE_PRECISION", 2))
+
+# Analyses run as background jobs on a shared pool; identical requests in flight share one job
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", 4))
+AUDIT_STAGES = ('fetch', 'process', 'analyze')
+
+_resources = {}
+# Reentrant: some factories build other resources (the EONET catalog needs the session)
+_resources_lock = threading.RLock()
+_warning_handler = logger.warning
+_model_factory = None
+# Job whose warnings should be attached to it rather than sent to the handler
+_current_job = contextvars.ContextVar('cludo_job', default=None)
+
+
+def configure(gemini_api_key=None, satellite_api_key=None, weather_api_key=None, warning_handler=None,
+              model_factory=None):
+    """Set API keys, where warnings go and how Gemini models are built
+
+    Resources built with older keys are rebuilt on next use.
+    """
+    global GEMINI_API_KEY, SATELLITE_API_KEY, WEATHER_API_KEY, _warning_handler, _model_factory
+    with _resources_lock:
+        if gemini_api_key is not None and gemini_api_key != GEMINI_API_KEY:
+            GEMINI_API_KEY = gemini_api_key
+            _resources.pop('model_registry', None)
+        if satellite_api_key is not None and satellite_api_key != SATELLITE_API_KEY:
+            SATELLITE_API_KEY = satellite_api_key
+            _resources.pop('asset_pipeline', None)
+        if weather_api_key is not None:
+            WEATHER_API_KEY = weather_api_key
+        if warning_handler is not None:
+            _warning_handler = warning_handler
+        if model_factory is not None:
+            _model_factory = model_factory
+            _resources.pop('model_registry', None)
+
+
+def warn(message):
+    job = _current_job.get()
+    if job is not None:
+        job.notify('warning', message)
+    else:
+        _warning_handler(message)
+
+
+def _resource(name, factory):
+    """Process-wide instance built by factory on first use"""
+    resource = _resources.get(name)
+    if resource is None:
+        with _resources_lock:
+            resource = _resources.get(name)
+            if resource is None:
+                resource = _resources[name] = factory()
+    return resource
+
+
+def get_session():
+    """Shared HTTP session; provider URLs overridden from the environment are rate-limited like the defaults"""
+    def build():
+        # requests is only imported once something goes to the network
+        from http_transport import HOST_PROVIDERS, get_session, mount_provider
+
+        session = get_session()
+        for url, provider in ((PLANET_SEARCH_URL, 'planet'), (WEATHER_API_URL, 'weather'), (EONET_EVENTS_URL, 'eonet')):
+            origin = '{0.scheme}://{0.netloc}'.format(urlsplit(url))
+            if origin not in HOST_PROVIDERS:
+                mount_provider(session, origin + '/', provider)
+        return session
+    return _resource('session', build)
+
+
+def get_scene_cache():
+    """Process-wide Planet search cache, persisted across restarts"""
+    return _resource('scene_cache', lambda: TieredCache(
+        "planet_coverage", ttl=PLANET_CACHE_TTL, max_disk_bytes=PLANET_CACHE_MAX_BYTES))
+
+
+def get_asset_pipeline():
+    """Process-wide asset downloader and decoder pool"""
+    def build():
+        from asset_pipeline import AssetCache, AssetDownloader, AssetPipeline
+        from tile_store import TileStore
+
+        downloader = AssetDownloader(get_session(), SATELLITE_API_KEY, AssetCache(max_bytes=PLANET_ASSET_CACHE_BYTES))
+        return AssetPipeline(downloader, store=TileStore(max_bytes=PLANET_TILE_CACHE_BYTES))
+    return _resource('asset_pipeline', build)
+
+
+def get_eonet_catalog():
+    """Process-wide EONET catalog, refreshed by a background thread started on first use"""
+    return _resource('eonet_catalog', lambda: EonetCatalog(
+        get_session(), url=EONET_EVENTS_URL, refresh_interval=EONET_REFRESH_INTERVAL).start())
+
+
+def get_model_registry():
+    """Process-wide Gemini model registry shared by all sessions"""
+    return _resource('model_registry', lambda: ModelRegistry(GEMINI_API_KEY, model_factory=_model_factory))
+
+
+def get_analysis_cache():
+    """Process-wide Gemini verdict cache, persisted across restarts"""
+    return _resource('analysis_cache', lambda: TieredCache(
+        "gemini_analysis", ttl=ANALYSIS_CACHE_TTL, max_disk_bytes=ANALYSIS_CACHE_MAX_BYTES))
+
+
+def get_weather_cache():
+    """Process-wide weather cache, written through to disk so batch workers share it"""
+    return _resource('weather_cache', lambda: WeatherCache(
+        request_weather, precision=WEATHER_CELL_PRECISION, ttl=WEATHER_CACHE_TTL, stale_ttl=WEATHER_STALE_TTL,
+        store=TieredCache("weather", ttl=WEATHER_STALE_TTL, max_disk_bytes=8 * 1024 * 1024)))
+
+
+def get_job_queue():
+    """Process-wide analysis job queue shared by all sessions"""
+    return _resource('job_queue', lambda: JobQueue(workers=ANALYSIS_WORKERS))
+
+
+def calculate_ndvi(red, nir):
+    """Calculate NDVI from red and NIR bands (single values or whole band arrays)"""
+    if np.ndim(red) > 0 or np.ndim(nir) > 0:
+        return ndvi(red, nir)
+    if nir + red == 0:
+        return 0
+    return (nir - red) / (nir + red)
+
+
+def slim_feature(feature):
+    """Keep only the scene fields the pipeline reads so cached results stay small"""
+    props = feature.get('properties', {})
+    return {
+        'id': feature.get('id'),
+        'properties': {key: props[key] for key in SCENE_PROPERTIES if key in props}
+    }
+
+
+@traced("planet.search")
+def fetch_real_satellite_data(lat, lon, start_date, end_date, max_scenes=None):
+    """Fetch real satellite data using Planet Labs API, searching only date ranges not already held
+
+    Returns at most max_scenes scenes, newest first. Search pages are pulled
+    lazily and stop at the cap, so the list handed to processing is bounded
+    by PLANET_MAX_SCENES however busy the site is.
+    """
+    max_scenes = PLANET_MAX_SCENES if max_scenes is None else max_scenes
+    cache = get_scene_cache()
+    location_key = quantize_location(lat, lon)
+    coverage = SceneCoverage.from_dict(cache.get(location_key))
+
+    gaps = coverage.gaps(start_date, end_date)
+    remaining = max_scenes - len(coverage.features_between(start_date, end_date))
+    failed = False
+    # Newest gaps first, so the cap keeps the most recent scenes of the window
+    for gap_start, gap_end in reversed(gaps):
+        if remaining <= 0:
+            break
+
+        limit = remaining
+        found, pulled = [], 0
+        try:
+            for feature in search_planet_scenes(lat, lon, gap_start, gap_end, limit=limit):
+                pulled += 1
+                # Scenes without a usable acquisition date cannot be placed in the window
+                if acquired_date(feature) is not None:
+                    found.append(feature)
+        except Exception as e:
+            # Keep what arrived but leave the gap uncovered so the next analysis retries it
+            coverage.add_features(found)
+            warn(f"Satellite API error: {str(e)}. Using simulated data.")
+            failed = True
+            continue
+
+        remaining -= len(found)
+        if pulled < limit:
+            coverage.add(gap_start, gap_end, found)
+            continue
+
+        # Results arrive newest first, so only the oldest day reached may be incomplete
+        coverage.add_features(found)
+        covered_from = min(map(acquired_date, found)) + timedelta(days=1) if found else None
+        if covered_from is not None and covered_from <= gap_end:
+            coverage.add(covered_from, gap_end, [])
+
+    if len(gaps) > 0:
+        cache.set(location_key, coverage.to_dict())
+
+    features = coverage.features_between(start_date, end_date)
+    if failed and len(features) == 0:
+        return None
+    return heapq.nlargest(max_scenes, features, key=lambda feature: feature['properties']['acquired'])
+
+
+def acquired_date(feature):
+    """Acquisition day of a scene, or None if it is missing or malformed"""
+    try:
+        return datetime.strptime(feature['properties']['acquired'][:10], '%Y-%m-%d').date()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def search_planet_scenes(lat, lon, start_date, end_date, limit=None):
+    """Stream slimmed scenes from one Planet quick-search, page by page"""
+    headers = {
+        "Authorization": f"api-key {SATELLITE_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    payload = build_search_filter(lat, lon, start_date, end_date)
+
+    return iter_search_features(
+        get_session(), payload, headers,
+        limit=limit,
+        transform=slim_feature,
+        page_size=PLANET_PAGE_SIZE,
+        search_url=PLANET_SEARCH_URL
+    )
+
+
+@traced("process")
+def process_real_satellite_data(features, start_date, end_date, max_scenes=None, scene_stats=None, period=None):
+    """Composite real Planet Labs scenes (any iterable, up to max_scenes) into one observation per period"""
+    max_scenes = PLANET_MAX_SCENES if max_scenes is None else max_scenes
+    period = COMPOSITE_PERIOD if period is None else period
+    scene_ids, acquired, cloud_covers, clear_percents = [], [], [], []
+
+    if features is None:
+        return None
+
+    for feature in features:
+        if len(acquired) >= max_scenes:
+            break
+
+        props = feature.get('properties', {})
+        if props.get('acquired'):
+            scene_ids.append(feature.get('id'))
+            acquired.append(props['acquired'])
+            cloud_covers.append(props.get('cloud_cover', 0.5))
+            clear_percents.append(props.get('clear_percent', np.nan))
+
+    # Scenes whose acquisition time cannot be parsed are dropped rather than dated today
+    dates = parse_timestamps(acquired)
+    valid = ~np.isnat(dates)
+    if not valid.any():
+        return None
+
+    dates = dates[valid]
+    cloud_cover = np.array(cloud_covers, dtype=np.float64)[valid]
+    clear_percent = np.array(clear_percents, dtype=np.float64)[valid]
+    # Planet reports clear_percent on a 0-100 scale; only the compositing weights use it as a fraction
+    clear_fraction = clear_percent / 100
+
+    # Estimate NDVI based on image quality (real calculation would need actual bands)
+    # Higher clear_percent and lower cloud_cover = healthier vegetation; kept on the raw scale the estimate always used
+    estimated = np.clip(0.3 + np.nan_to_num(clear_percent, nan=0.5) * 0.4 - cloud_cover * 0.2, 0.1, 0.9)
+    columns = {
+        'ndvi': estimated,
+        'red': np.full(len(dates), 0.3),
+        'nir': 0.3 + estimated,
+        'moisture': 0.2 + np.random.uniform(-0.05, 0.05, len(dates)),
+        'cloud_cover': cloud_cover,
+    }
+
+    # Prefer NDVI measured on the downloaded bands when we have it
+    measurements = [(scene_stats or {}).get(scene_id) for scene_id, keep in zip(scene_ids, valid) if keep]
+    measurements = [m if m and not np.isnan(m['mean']) else None for m in measurements]
+    measured_mask = np.array([m is not None for m in measurements])
+    if measured_mask.any():
+        def measured_column(key):
+            return np.array([m[key] if m is not None else np.nan for m in measurements])
+
+        columns['ndvi'] = np.where(measured_mask, measured_column('mean'), estimated)
+        columns.update({
+            'ndvi_min': measured_column('min'),
+            'ndvi_max': measured_column('max'),
+            'ndvi_p10': measured_column('p10'),
+            'ndvi_p90': measured_column('p90'),
+            'valid_fraction': measured_column('valid_fraction'),
+            'measured': measured_mask,
+        })
+
+    scenes = SatelliteSeries(dates, source='real_satellite', **columns)
+    return composite(scenes, scene_weights(cloud_cover, clear_fraction), period)
+
+
+@traced("planet.assets")
+def measure_scene_ndvi(features, lat, lon):
+    """Measure NDVI on downloaded bands for the clearest scenes, keyed by item id"""
+    if not PLANET_DOWNLOAD_ASSETS or not features:
+        return {}
+
+    clearest = sorted(features, key=lambda f: f.get('properties', {}).get('cloud_cover', 1.0))[:PLANET_MAX_DOWNLOADS]
+    try:
+        return get_asset_pipeline().measure([f['id'] for f in clearest if f.get('id')], lat, lon, buffer_m=AUDIT_BUFFER_M)
+    except Exception as e:
+        warn(f"Scene download error: {str(e)}. Using estimated NDVI.")
+        return {}
+
+
+@traced("weather")
+def fetch_weather_data(lat, lon):
+    """Current weather near a location, served from the shared cache when it is fresh"""
+    if not WEATHER_API_KEY:
+        return None
+    return get_weather_cache().get(lat, lon)
+
+
+def warm_weather_cache(locations):
+    """Fetch the weather for every cache cell of (lat, lon) locations ahead of a batch run"""
+    if not WEATHER_API_KEY:
+        return 0
+    return get_weather_cache().warm(locations)
+
+
+@traced("weather.request")
+def request_weather(lat, lon):
+    """Fetch real-time weather data from OpenWeather"""
+    try:
+        params = {'lat': lat, 'lon': lon, 'appid': WEATHER_API_KEY, 'units': 'metric'}
+        response = get_session().get(WEATHER_API_URL, params=params, timeout=5)
+
+        if response.status_code == 200:
+            return response.json()
+        return None
+    except:
+        return None
+
+
+@traced("eonet")
+def fetch_disaster_data(lat, lon, radius_km=100):
+    """Find open NASA EONET disaster events near a location"""
+    catalog = get_eonet_catalog()
+    # Only analyses started before the first refresh finishes wait for it
+    catalog.wait_ready(timeout=EONET_INITIAL_WAIT)
+    return catalog.nearby(lat, lon, radius_km)
+
+
+@traced("simulate")
+def generate_mock_satellite_data(start_date, end_date, lat, lon):
+    """Generate mock satellite data for demonstration, reproducible for the same site and dates"""
+    # Monthly observations with declining vegetation health
+    dates = observation_dates(start_date, end_date, MOCK_CADENCE_DAYS)
+    if len(dates) == 0:
+        return SatelliteSeries.empty(source='simulated')
+
+    seed = location_seed(lat, lon, start_date, end_date)
+    targets = synthesize_ndvi(
+        [seed], dates,
+        base_ndvi=0.7,
+        decline_per_year=0.15,
+        seasonal_amplitude=0,
+        noise=0.03
+    )['ndvi'][0].astype(np.float64)
+    targets = np.maximum(0.2, targets)
+
+    # Synthesize band patches around the point so the timeline shows real zonal statistics
+    rng = np.random.default_rng(seed)
+    shape = (len(dates), MOCK_PATCH_SIZE, MOCK_PATCH_SIZE)
+    pixel_ndvi = np.clip(targets[:, None, None] + rng.normal(0, 0.05, shape), -0.95, 0.95)
+    pixel_moisture = 0.2 + rng.uniform(-0.05, 0.05, shape)
+    red = 0.3 + rng.uniform(-0.05, 0.05, shape)
+    nir = red * (1 + pixel_ndvi) / (1 - pixel_ndvi)
+    swir = nir * (1 - pixel_moisture) / (1 + pixel_moisture)
+    red[rng.random(shape) < MOCK_CLOUD_FRACTION] = 0  # cloud-masked pixels
+
+    center = MOCK_PATCH_SIZE // 2
+    stats = scene_statistics({'red': red, 'nir': nir, 'swir': swir}, center=(center, center), radius_px=center, nodata=0)
+
+    return SatelliteSeries(
+        dates,
+        source='simulated',
+        red=red.mean(axis=(1, 2)),
+        nir=nir.mean(axis=(1, 2)),
+        ndvi=stats['ndvi']['mean'],
+        ndvi_min=stats['ndvi']['min'],
+        ndvi_max=stats['ndvi']['max'],
+        ndvi_p10=stats['ndvi']['p10'],
+        ndvi_p90=stats['ndvi']['p90'],
+        valid_fraction=stats['ndvi']['valid_fraction'],
+        moisture=stats['ndmi']['mean']
+    )
+
+
+def _retry_delay(error):
+    # google.api_core errors carry a RetryInfo detail; the stub sets retry_after
+    for detail in getattr(error, 'details', None) or ():
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    return getattr(error, 'retry_after', None)
+
+
+def call_gemini(request):
+    """Run request() within the Gemini key's rate limit, waiting out quota errors and trying again"""
+    limiter = get_limiter()
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        limiter.acquire('gemini', GEMINI_API_KEY)
+        try:
+            return request()
+        except Exception as e:
+            if getattr(e, 'code', None) != 429 or attempt == RATE_LIMIT_RETRIES:
+                raise
+            limiter.penalize('gemini', GEMINI_API_KEY, _retry_delay(e))
+
+
+@traced("gemini")
+def analyze_with_gemini(ndvi_data, location, description, on_field=None):
+    """Analyze satellite data using Gemini AI
+
+    The verdict is streamed as schema-constrained JSON; `on_field(key, value,
+    fields_so_far)` is called as each field arrives so the UI can render early.
+    """
+    registry = get_model_registry()
+    with span("gemini.model"):
+        model = registry.get_model() if GEMINI_API_KEY else None
+    if model is None:
+        return generate_fallback_analysis(ndvi_data)
+
+    cache = get_analysis_cache()
+    with span("gemini.cache"):
+        key = analysis_cache_key(registry.model_name, location, ndvi_data, description, ANALYSIS_CACHE_PRECISION)
+        cached = cache.get(key)
+    if cached is not None:
+        return {**cached, 'servedFromCache': True}
+
+    try:
+        with span("gemini.prompt"):
+            prompt = build_site_prompt(ndvi_data, location, description, PROMPT_TOKEN_BUDGET)
+        with span("gemini.stream"):
+            analysis = call_gemini(lambda: stream_analysis(model, prompt, on_field))
+        cache.set(key, analysis)
+        return {**analysis, 'servedFromCache': False}
+
+    except Exception as e:
+        warn(f"Gemini API error: {str(e)}. Using fallback analysis.")
+        return generate_fallback_analysis(ndvi_data)
+
+
+def analyze_sites_with_gemini(sites):
+    """Analyze several sites in one Gemini request
+
+    `sites` are dicts with id, ndvi_data, location and description. Returns
+    {site id: analysis}; cached sites are not sent again and sites missing
+    from the answer get the fallback.
+    """
+    registry = get_model_registry()
+    model = registry.get_model() if GEMINI_API_KEY else None
+    if model is None:
+        fallbacks = generate_fallback_analyses([site['ndvi_data'] for site in sites])
+        return {site['id']: analysis for site, analysis in zip(sites, fallbacks)}
+
+    cache = get_analysis_cache()
+    keys = {
+        site['id']: analysis_cache_key(registry.model_name, site['location'], site['ndvi_data'], site['description'],
+                                       ANALYSIS_CACHE_PRECISION)
+        for site in sites
+    }
+    results = {}
+    for site in sites:
+        cached = cache.get(keys[site['id']])
+        if cached is not None:
+            results[site['id']] = {**cached, 'servedFromCache': True}
+
+    pending = [site for site in sites if site['id'] not in results]
+    verdicts = {}
+    if pending:
+        try:
+            prompt = build_batch_prompt(pending, PROMPT_TOKEN_BUDGET * len(pending))
+            response = call_gemini(lambda: model.generate_content(
+                prompt, generation_config=generation_config(BATCH_RESPONSE_SCHEMA)))
+            verdicts = parse_batch_response(response.text, [s['id'] for s in pending])
+        except Exception as e:
+            warn(f"Gemini API error: {str(e)}. Using fallback analysis.")
+
+    for site in pending:
+        try:
+            verdict = validate_analysis(verdicts.get(site['id']))
+        except ValueError:
+            verdict = None
+        if verdict:
+            cache.set(keys[site['id']], verdict)
+            results[site['id']] = {**verdict, 'servedFromCache': False}
+        else:
+            results[site['id']] = generate_fallback_analysis(site['ndvi_data'])
+    return results
+
+
+@traced("fallback")
+def generate_fallback_analyses(series_list):
+    """Rule-based analyses for many NDVI series at once from the vectorized trend engine"""
+    values, days = series_matrix(series_list)
+    trends = analyze_trends(values, days)
+    risk = classify_risk(trends)
+
+    analyses = []
+    for i, ndvi_data in enumerate(series_list):
+        level = float(trends['level'][i])
+        deforestation_detected = bool(risk['deforestation'][i])
+        summary = (
+            f"Vegetation analysis shows {'significant degradation' if deforestation_detected else 'stable conditions'} "
+            f"with NDVI of {level:.2f}. Robust trend: {trends['slope_per_year'][i]:+.2f}/year"
+        )
+        if trends['change_detected'][i]:
+            changed_on = ndvi_data[int(trends['change_index'][i])]['date'].strftime('%Y-%m-%d')
+            summary += f"; abrupt shift of {trends['change_shift'][i]:+.2f} around {changed_on}"
+
+        analyses.append({
+            'summary': summary,
+            'riskLevel': str(risk['risk'][i]),
+            'deforestationDetected': deforestation_detected,
+            'vegetationHealth': 'Healthy' if level > 0.6 else 'Moderate' if level > 0.4 else 'Degraded',
+            'recommendations': [
+                'Continue monitoring vegetation trends',
+                'Verify findings with ground truth data',
+                'Consider local environmental factors'
+            ],
+            'confidence': round(float(risk['confidence'][i]), 2)
+        })
+    return analyses
+
+
+def generate_fallback_analysis(ndvi_data):
+    """Generate fallback analysis if Gemini fails"""
+    return generate_fallback_analyses([ndvi_data])[0]
+
+
+def audit_key(lat, lon, start_date, end_date, description):
+    """Requests with the same key produce the same audit and can share one job"""
+    return (quantize_location(lat, lon), start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+            ' '.join(description.split()))
+
+
+def submit_audit(lat, lon, start_date, end_date, description):
+    """Queue a site audit, or join the identical one already running"""
+    return get_job_queue().submit(audit_key(lat, lon, start_date, end_date, description), AUDIT_STAGES,
+                                  run_audit, lat, lon, start_date, end_date, description)
+
+
+def run_audit(job, lat, lon, start_date, end_date, description):
+    """Fetch, process and analyze one site, reporting stage progress and notices on the job"""
+    location = {'lat': lat, 'lon': lon}
+    token = _current_job.set(job)
+    try:
+        with get_tracer().trace("analysis") as trace:
+            # Satellite, weather and disaster data are fetched concurrently, each with its own deadline
+            with job.stage('fetch'), span("fetch"):
+                fetched = fetch_all({
+                    'satellite': bind(lambda: fetch_real_satellite_data(lat, lon, start_date, end_date)),
+                    'weather': bind(lambda: fetch_weather_data(lat, lon)),
+                    'disasters': bind(lambda: fetch_disaster_data(lat, lon)),
+                })
+            features = fetched.get('satellite')
+
+            with job.stage('process'):
+                satellite_data = None
+                if features:
+                    scene_stats = measure_scene_ndvi(features, lat, lon)
+                    satellite_data = process_real_satellite_data(features, start_date, end_date, scene_stats=scene_stats)
+                    if satellite_data:
+                        scenes = int(np.sum(satellite_data.columns['scenes']))
+                        job.notify('success', f"✅ Using {scenes} real satellite images from Planet Labs merged into "
+                                              f"{len(satellite_data)} composites (one per {COMPOSITE_PERIOD})!")
+                    else:
+                        job.notify('info', "ℹ️ Processing real data failed, using simulated data")
+                elif 'satellite' in fetched.timed_out:
+                    job.notify('info', "ℹ️ Satellite API timed out, using simulated data for analysis")
+                else:
+                    job.notify('info', "ℹ️ No real satellite data available, using simulated data for analysis")
+                if not satellite_data:
+                    satellite_data = generate_mock_satellite_data(start_date, end_date, lat, lon)
+
+            with job.stage('analyze'):
+                # Streamed fields are published on the job so polling pages can show the verdict early
+                analysis = analyze_with_gemini(satellite_data, location, description,
+                                               lambda key, value, fields: job.update(fields))
+    finally:
+        _current_job.reset(token)
+
+    return {
+        'satellite_data': satellite_data,
+        'weather_data': fetched.get('weather'),
+        'disaster_data': fetched.get('disasters') or [],
+        'timed_out_sources': fetched.timed_out,
+        'analysis': analysis,
+        'trace': trace.to_dict(),
+    }
@@ -0,0 +1,187 @@
+"""
+Shared NASA EONET open-events catalog.
+
+A background thread keeps a snapshot of the open-events feed fresh using
+conditional requests (ETag / Last-Modified). Every geometry point of every
+event goes into a lat/lon grid index, so a radius query only measures
+haversine distances to points in the few cells around the audit location and
+never touches the network.
+"""
+
+import math
+import threading
+import time
+
+from geo import haversine_km
+
+EONET_EVENTS_URL = "https://eonet.gsfc.nasa.gov/api/v3/events?status=open"
+DEFAULT_REFRESH_INTERVAL = 15 * 60
+DEFAULT_RETRY_INTERVAL = 60
+DEFAULT_CELL_DEGREES = 1.0
+KM_PER_DEGREE = 111.32
+
+
+def _iter_points(coordinates):
+    """Yield (lon, lat) pairs from Point, LineString or Polygon coordinates"""
+    if not isinstance(coordinates, (list, tuple)) or len(coordinates) == 0:
+        return
+    if isinstance(coordinates[0], (int, float)):
+        if len(coordinates) >= 2:
+            yield coordinates[0], coordinates[1]
+        return
+    for part in coordinates:
+        yield from _iter_points(part)
+
+
+class EventIndex:
+    """Grid index over every geometry point of every event"""
+
+    def __init__(self, events, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.lon_cells = int(round(360 / cell_degrees))
+        self.events = []
+        self.cells = {}
+        self.point_count = 0
+
+        for event in events:
+            event_id = len(self.events)
+            self.events.append({
+                'title': event.get('title', 'Unknown'),
+                'category': (event.get('categories') or [{}])[0].get('title', 'Unknown'),
+            })
+            for geom in event.get('geometry', []):
+                for lon, lat in _iter_points(geom.get('coordinates')):
+                    cell = self._cell(lat, lon)
+                    self.cells.setdefault(cell, []).append((lat, lon, event_id, geom.get('date', 'Unknown')))
+                    self.point_count += 1
+
+    def _cell(self, lat, lon):
+        return (int(math.floor((lat + 90) / self.cell_degrees)),
+                int(math.floor((lon + 180) / self.cell_degrees)) % self.lon_cells)
+
+    def _candidate_cells(self, lat, lon, radius_km):
+        lat_span = radius_km / KM_PER_DEGREE
+        low_row = int(math.floor((max(-90.0, lat - lat_span) + 90) / self.cell_degrees))
+        high_row = int(math.floor((min(90.0, lat + lat_span) + 90) / self.cell_degrees))
+
+        cos_lat = math.cos(math.radians(min(89.9, abs(lat) + lat_span)))
+        lon_span = radius_km / (KM_PER_DEGREE * cos_lat)
+        if lon_span >= 180:
+            columns = range(self.lon_cells)
+        else:
+            first = int(math.floor((lon - lon_span + 180) / self.cell_degrees))
+            last = int(math.floor((lon + lon_span + 180) / self.cell_degrees))
+            columns = sorted({col % self.lon_cells for col in range(first, last + 1)})
+
+        for row in range(low_row, high_row + 1):
+            for col in columns:
+                yield row, col
+
+    def nearby(self, lat, lon, radius_km):
+        """Events with any geometry point within radius_km, nearest first"""
+        best = {}
+        for cell in self._candidate_cells(lat, lon, radius_km):
+            for p_lat, p_lon, event_id, date in self.cells.get(cell, ()):
+                dist = haversine_km(lat, lon, p_lat, p_lon)
+                if dist <= radius_km and (event_id not in best or dist < best[event_id][0]):
+                    best[event_id] = (dist, date)
+
+        return [
+            {**self.events[event_id], 'date': date, 'distance_km': round(dist, 1)}
+            for event_id, (dist, date) in sorted(best.items(), key=lambda item: item[1][0])
+        ]
+
+
+class EonetCatalog:
+    """Background-refreshed EONET snapshot with an in-memory spatial index"""
+
+    def __init__(self, session=None, url=EONET_EVENTS_URL, refresh_interval=DEFAULT_REFRESH_INTERVAL,
+                 retry_interval=DEFAULT_RETRY_INTERVAL, cell_degrees=DEFAULT_CELL_DEGREES, timeout=10):
+        self._session = session
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.cell_degrees = cell_degrees
+        self.timeout = timeout
+        self.index = None
+        self.etag = None
+        self.last_modified = None
+        self.refreshed_at = None
+        self.last_error = None
+        self.stats = {'refreshes': 0, 'not_modified': 0, 'failures': 0}
+        self._ready = threading.Event()
+        # Set once the first refresh has finished, whether or not it succeeded
+        self._attempted = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _get_session(self):
+        if self._session is None:
+            from http_transport import get_session
+            self._session = get_session()
+        return self._session
+
+    def refresh(self):
+        """Fetch the feed once, conditionally; returns True if the snapshot is usable"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        try:
+            response = self._get_session().get(self.url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and self.index is not None:
+                self.stats['not_modified'] += 1
+            elif response.status_code == 200:
+                # Build the new index off to the side and swap it in atomically
+                self.index = EventIndex(response.json().get('events', []), self.cell_degrees)
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+                self.stats['refreshes'] += 1
+            else:
+                raise Exception(f"EONET returned status {response.status_code}")
+        except Exception as e:
+            self.last_error = str(e)
+            self.stats['failures'] += 1
+            return self.index is not None
+        finally:
+            # Waiters go ahead with whatever the catalog holds instead of blocking on every retry
+            self._attempted.set()
+
+        self.refreshed_at = time.time()
+        self.last_error = None
+        self._ready.set()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            ok = self.refresh()
+            self._stop.wait(self.refresh_interval if ok else self.retry_interval)
+
+    def start(self):
+        """Start the background refresh thread (idempotent)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="eonet-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def wait_ready(self, timeout=None):
+        """Block until the first refresh has finished; returns whether a snapshot is loaded"""
+        self._attempted.wait(timeout)
+        return self._ready.is_set()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def nearby(self, lat, lon, radius_km=100):
+        """Radius query against the current snapshot; never touches the network"""
+        index = self.index
+        if index is None:
+            return []
+        return index.nearby(lat, lon, radius_km)
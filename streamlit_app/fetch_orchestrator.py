@@ -0,0 +1,77 @@
+"""
+Concurrent fan-out of the external data fetches.
+
+Every source runs on a shared thread pool with its own deadline, measured from
+the moment the fan-out starts. A slow source only costs its own deadline; the
+others are returned as soon as they finish and the slow one is reported as
+timed out instead of holding the whole analysis back.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Deadlines (seconds) per source, matching the request timeouts of the fetch helpers
+DEFAULT_DEADLINES = {
+    'satellite': 10,
+    'weather': 5,
+    'disasters': 5,
+}
+DEFAULT_DEADLINE = 10
+
+# Shared across sessions; threads that overrun their deadline finish in the background
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="cludo-fetch")
+
+
+class FetchResult:
+    """Outcome of a fan-out: per-source values plus timeouts, errors and timings"""
+
+    def __init__(self):
+        self.results = {}
+        self.timed_out = []
+        self.errors = {}
+        self.timings = {}
+        self.wall_time = 0.0
+
+    def get(self, name, default=None):
+        return self.results.get(name, default)
+
+    def ok(self, name):
+        return name in self.results and name not in self.errors
+
+
+def fetch_all(sources, deadlines=None, executor=None):
+    """Run every zero-argument callable in `sources` concurrently with per-source deadlines"""
+    deadlines = {**DEFAULT_DEADLINES, **(deadlines or {})}
+    executor = executor or _executor
+    outcome = FetchResult()
+
+    started = time.perf_counter()
+    finished_at = {}
+
+    def timed(name, fn):
+        def run():
+            try:
+                return fn()
+            finally:
+                finished_at[name] = time.perf_counter()
+        return run
+
+    futures = {name: executor.submit(timed(name, fn)) for name, fn in sources.items()}
+
+    # Collect in deadline order so the total wait never exceeds the longest deadline
+    for name in sorted(futures, key=lambda n: deadlines.get(n, DEFAULT_DEADLINE)):
+        remaining = started + deadlines.get(name, DEFAULT_DEADLINE) - time.perf_counter()
+        try:
+            outcome.results[name] = futures[name].result(timeout=max(0.0, remaining))
+        except FutureTimeoutError:
+            futures[name].cancel()
+            outcome.timed_out.append(name)
+        except Exception as e:
+            outcome.errors[name] = str(e)
+            outcome.results[name] = None
+
+        if name in finished_at:
+            outcome.timings[name] = finished_at[name] - started
+
+    outcome.wall_time = time.perf_counter() - started
+    return outcome
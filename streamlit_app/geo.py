@@ -0,0 +1,41 @@
+"""Small geographic helpers shared by the caches and spatial lookups"""
+
+import math
+
+DEFAULT_QUANTUM = 0.001          # degrees, roughly 110 m at the equator
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def quantize_location(lat, lon, quantum=DEFAULT_QUANTUM):
+    """Snap a coordinate to a grid so nearby audit points share cache entries"""
+    decimals = max(0, len(f"{quantum:f}".rstrip('0').split('.')[1]))
+    q_lat = round(round(lat / quantum) * quantum, decimals)
+    q_lon = round(round(lon / quantum) * quantum, decimals)
+    return f"{q_lat:.{decimals}f},{q_lon:.{decimals}f}"
+
+
+def geohash(lat, lon, precision=5):
+    """Geohash of a point; precision 5 cells are about 4.9 x 4.9 km, 6 about 1.2 x 0.6 km"""
+    bits = precision * 5
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    lon_cell = min(int((lon + 180) / 360 * (1 << lon_bits)), (1 << lon_bits) - 1)
+    lat_cell = min(int((lat + 90) / 180 * (1 << lat_bits)), (1 << lat_bits) - 1)
+
+    # Interleave the cell bits, longitude first, from the most significant down
+    code = 0
+    for i in range(bits):
+        if i % 2 == 0:
+            code = (code << 1) | (lon_cell >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            code = (code << 1) | (lat_cell >> (lat_bits - 1 - i // 2)) & 1
+    return "".join(GEOHASH_ALPHABET[(code >> 5 * (precision - 1 - k)) & 31] for k in range(precision))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,149 @@
+"""
+Shared pooled HTTP transport for the external providers.
+
+One requests.Session is shared by every fetch helper and every session of the
+app, so connections to Planet, OpenWeather and EONET stay alive between
+analyses. Each host gets its own bounded connection pool, and 5xx answers
+are retried a few times with jittered exponential backoff.
+
+Requests to a provider's host first take a token from that provider's rate
+limiter bucket (per API key). A 429 closes the bucket for the Retry-After
+the provider asked for, and the request queues for a new token and is sent
+again, so concurrent sessions slow down together instead of each burning
+its retries.
+"""
+
+import random
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limit import RATE_LIMIT_RETRIES, get_limiter, parse_retry_after
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5     # 0.5s, 1s, 2s ... before jitter
+DEFAULT_BACKOFF_MAX = 8          # cap on a single backoff sleep
+DEFAULT_MAX_CONNECTIONS = 10     # per host
+
+# Per-host connection limits for the providers we talk to
+HOST_CONNECTION_LIMITS = {
+    'https://api.planet.com': 8,
+    'https://api.openweathermap.org': 4,
+    'https://eonet.gsfc.nasa.gov': 2,
+}
+
+# Rate limiter bucket for each provider host
+HOST_PROVIDERS = {
+    'https://api.planet.com': 'planet',
+    'https://api.openweathermap.org': 'weather',
+    'https://eonet.gsfc.nasa.gov': 'eonet',
+}
+
+# Where a request carries its API key when it is not in the Authorization header
+KEY_PARAMS = ('appid', 'key', 'api_key')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class JitteredRetry(Retry):
+    """Retry whose exponential backoff is spread with full jitter"""
+
+    def get_backoff_time(self):
+        backoff = min(super().get_backoff_time(), DEFAULT_BACKOFF_MAX)
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+def build_retry(retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR, statuses=RETRY_STATUSES):
+    """Bounded retry policy for idempotent provider calls (Planet search is a POST)"""
+    return JitteredRetry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        status_forcelist=statuses,
+        allowed_methods=frozenset({'GET', 'HEAD', 'POST'}),
+        backoff_factor=backoff_factor,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def request_api_key(request):
+    """API key a prepared request authenticates with, or None"""
+    if 'Authorization' in request.headers:
+        return request.headers['Authorization']
+    query = parse_qs(urlsplit(request.url).query)
+    for name in KEY_PARAMS:
+        if name in query:
+            return query[name][0]
+    return None
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """Adapter that takes a rate limiter token before every request and backs off on 429"""
+
+    def __init__(self, provider, rate_retries=RATE_LIMIT_RETRIES, limiter=None, **kwargs):
+        self.provider = provider
+        self.rate_retries = rate_retries
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        limiter = self.limiter or get_limiter()
+        key = request_api_key(request)
+        for attempt in range(self.rate_retries + 1):
+            limiter.acquire(self.provider, key)
+            response = super().send(request, **kwargs)
+            if response.status_code != 429 or attempt == self.rate_retries:
+                return response
+            limiter.penalize(self.provider, key, parse_retry_after(response.headers.get('Retry-After')))
+            response.close()
+
+
+def _adapter(max_connections, retry, hosts=1, provider=None):
+    # pool_block makes callers wait for a free connection instead of opening extra ones
+    options = dict(pool_connections=hosts, pool_maxsize=max_connections, pool_block=True, max_retries=retry)
+    if provider is None:
+        return HTTPAdapter(**options)
+    return RateLimitedAdapter(provider, **options)
+
+
+def mount_provider(session, prefix, provider, max_connections=DEFAULT_MAX_CONNECTIONS,
+                   retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """Rate-limit requests under a URL prefix as the given provider (429s are left to the limiter)"""
+    statuses = tuple(status for status in RETRY_STATUSES if status != 429)
+    session.mount(prefix, _adapter(max_connections, build_retry(retries, backoff_factor, statuses), provider=provider))
+
+
+def create_session(host_limits=None, max_connections=DEFAULT_MAX_CONNECTIONS, retries=DEFAULT_RETRIES,
+                   backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """Build a keep-alive session with per-host pools and retry/backoff"""
+    retry = build_retry(retries, backoff_factor)
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+    session.mount('https://', _adapter(max_connections, retry, hosts=10))
+    session.mount('http://', _adapter(max_connections, retry, hosts=10))
+    for prefix, limit in (HOST_CONNECTION_LIMITS if host_limits is None else host_limits).items():
+        provider = HOST_PROVIDERS.get(prefix)
+        if provider is None:
+            session.mount(prefix, _adapter(limit, retry))
+        else:
+            mount_provider(session, prefix, provider, limit, retries, backoff_factor)
+
+    return session
+
+
+def get_session():
+    """Process-wide shared session, created on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
@@ -0,0 +1,175 @@
+"""
+Background analysis jobs.
+
+Analyses run on a process-wide worker pool instead of the Streamlit script
+thread. A job records the state of each of its stages, the notices it
+raised and the analysis fields streamed so far, so any number of sessions
+can poll it while it runs. Submitting a job whose key matches one still in
+flight joins that job instead of starting another (singleflight), so two
+users auditing the same site share one set of API calls.
+
+Finished jobs stay readable by id for a while so a polling page can pick up
+the result after the job has left the in-flight table.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_KEEP_FINISHED = 200
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+_job_ids = itertools.count(1)
+
+
+class Job:
+    """One submitted analysis: per-stage progress, notices, streamed fields and the outcome"""
+
+    def __init__(self, key, stages):
+        self.id = f"job-{next(_job_ids)}"
+        self.key = key
+        self.stages = {name: PENDING for name in stages}
+        self.notices = []
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.subscribers = 1
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Mark a stage running for the duration of the block, then done (or failed if it raised)"""
+        with self._lock:
+            self.stages[name] = RUNNING
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self.stages[name] = FAILED
+            raise
+        with self._lock:
+            self.stages[name] = DONE
+
+    def notify(self, level, message):
+        """Add a notice for the page to show ('success', 'info' or 'warning')"""
+        with self._lock:
+            self.notices.append((level, message))
+
+    def update(self, fields):
+        """Replace the analysis fields streamed so far"""
+        with self._lock:
+            self.partial = dict(fields)
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    @property
+    def progress(self):
+        """Fraction of stages finished"""
+        with self._lock:
+            finished = sum(state in (DONE, FAILED) for state in self.stages.values())
+        return finished / len(self.stages) if self.stages else float(self.done)
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; True if it did"""
+        return self._finished.wait(timeout)
+
+    def snapshot(self):
+        """Consistent copy of the job's progress for rendering"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'stages': dict(self.stages),
+                'notices': list(self.notices),
+                'partial': dict(self.partial),
+                'subscribers': self.subscribers,
+                'done': self.done,
+                'error': self.error,
+                'elapsed': (self.finished_at or time.time()) - self.submitted_at,
+            }
+
+    def _finish(self, result=None, error=None):
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+        self._finished.set()
+
+
+class JobQueue:
+    """Worker pool running jobs, with identical in-flight submissions sharing one job"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, keep_finished=DEFAULT_KEEP_FINISHED):
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cludo-job")
+        self._inflight = {}
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+
+    def submit(self, key, stages, fn, *args, **kwargs):
+        """Run fn(job, *args, **kwargs) on the pool, or return the job already running for key"""
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None:
+                job.subscribers += 1
+                self.deduplicated += 1
+                return job
+
+            job = Job(key, stages)
+            self._inflight[key] = job
+            self._jobs[job.id] = job
+            self.submitted += 1
+            self._trim()
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        """Job by id, or None once it has been forgotten"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._inflight),
+                'running': sum(job.started_at is not None for job in self._inflight.values()),
+                'submitted': self.submitted,
+                'deduplicated': self.deduplicated,
+            }
+
+    def _run(self, job, fn, args, kwargs):
+        job.started_at = time.time()
+        result, error = None, None
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            # Leave the in-flight table first so a new submission after this point starts fresh
+            with self._lock:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+            job._finish(result, error)
+
+    def _trim(self):
+        # Forget the oldest finished jobs beyond keep_finished; running jobs are never dropped
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
@@ -0,0 +1,113 @@
+"""
+Process-wide Gemini model registry.
+
+The registry probes the candidate model names once, keeps the first healthy
+one and only re-probes after its TTL expires, so Streamlit reruns never pay
+for an LLM round-trip just to find a working model.
+"""
+
+import threading
+import time
+
+DEFAULT_MODEL_NAMES = ['models/gemini-2.5-flash', 'models/gemini-2.0-flash', 'models/gemini-pro-latest']
+DEFAULT_PROBE_TTL = 30 * 60      # seconds a healthy model is trusted before re-probing
+DEFAULT_FAILURE_TTL = 60         # seconds a failed probe is remembered before retrying
+DEFAULT_PROBE_TIMEOUT = 5        # seconds each candidate gets to answer, without SDK retries
+
+
+def _default_model_factory(api_key):
+    """Build GenerativeModel instances after configuring the SDK once"""
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel
+
+
+class ModelRegistry:
+    """Lazily probes Gemini models and hands out the healthy one"""
+
+    def __init__(self, api_key, model_names=None, ttl=DEFAULT_PROBE_TTL,
+                 failure_ttl=DEFAULT_FAILURE_TTL, probe_timeout=DEFAULT_PROBE_TIMEOUT, model_factory=None,
+                 clock=time.monotonic):
+        self.api_key = api_key
+        self.model_names = list(model_names or DEFAULT_MODEL_NAMES)
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.probe_timeout = probe_timeout
+        self._model_factory = model_factory
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._model = None
+        self.model_name = None
+        self.last_error = None
+        self.probed_at = None
+        self.probe_count = 0
+        self.probe_timings = {}
+
+    def _is_fresh(self):
+        if self.probed_at is None:
+            return False
+        ttl = self.ttl if self._model is not None else self.failure_ttl
+        return self._clock() - self.probed_at < ttl
+
+    def get_model(self):
+        """Return the healthy model, probing only when missing or stale"""
+        if not self.api_key:
+            return None
+        if self._is_fresh():
+            return self._model
+        with self._lock:
+            if not self._is_fresh():
+                self._probe()
+            return self._model
+
+    def invalidate(self):
+        """Force the next get_model() call to re-probe"""
+        with self._lock:
+            self.probed_at = None
+
+    def _probe(self):
+        self.probe_count += 1
+        timings = {}
+        model = None
+        model_name = None
+        error = None
+
+        try:
+            if self._model_factory is None:
+                self._model_factory = _default_model_factory(self.api_key)
+
+            for name in self.model_names:
+                started = time.perf_counter()
+                try:
+                    candidate = self._model_factory(name)
+                    # Callers queue on the lock while we probe, so an unreachable API must fail fast
+                    candidate.generate_content("Hello", generation_config={'max_output_tokens': 1},
+                                               request_options={'timeout': self.probe_timeout, 'retry': None})
+                    model, model_name = candidate, name
+                    break
+                except Exception as e:
+                    error = e
+                finally:
+                    timings[name] = time.perf_counter() - started
+
+            if model is None and error is None:
+                error = Exception("No compatible Gemini model found")
+        except Exception as e:
+            error = e
+
+        self._model = model
+        self.model_name = model_name
+        self.last_error = None if model is not None else str(error)
+        self.probe_timings = timings
+        self.probed_at = self._clock()
+
+    def status(self):
+        """Snapshot of the last probe for display in the UI"""
+        return {
+            'model_name': self.model_name,
+            'probed': self.probed_at is not None,
+            'probe_count': self.probe_count,
+            'probe_timings': dict(self.probe_timings),
+            'error': self.last_error,
+        }
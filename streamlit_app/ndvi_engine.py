@@ -0,0 +1,138 @@
+"""
+Array-based spectral index engine.
+
+NDVI and NDMI are computed over whole band rasters (or stacks of rasters) with
+NumPy, masking nodata, non-finite values and zero denominators instead of
+looping over pixels. Zonal statistics are taken over a circular zone around
+the audit point, only reading the window that contains it.
+"""
+
+import warnings
+
+import numpy as np
+
+DEFAULT_PERCENTILES = (10, 50, 90)
+BLOCK_PIXELS = 1 << 18           # pixels per strip processed at once
+
+
+def normalized_difference(a, b, nodata=None, valid=None, dtype=np.float32):
+    """(a - b) / (a + b), NaN wherever an input is nodata, non-finite or the sum is zero"""
+    a = np.asarray(a, dtype=dtype)
+    b = np.asarray(b, dtype=dtype)
+    shape = np.broadcast_shapes(a.shape, b.shape)
+    a, b = np.broadcast_to(a, shape), np.broadcast_to(b, shape)
+    if valid is not None:
+        valid = np.broadcast_to(valid, shape)
+
+    result = np.empty(shape, dtype=dtype)
+    if result.size == 0:
+        return result
+    if result.ndim == 0:
+        return normalized_difference(a[None], b[None], nodata, None if valid is None else valid[None], dtype)[0]
+
+    # Work through row strips so the temporaries stay cache-sized on large scenes
+    width = shape[-1]
+    flat_a, flat_b, flat_out = a.reshape(-1, width), b.reshape(-1, width), result.reshape(-1, width)
+    flat_valid = None if valid is None else valid.reshape(-1, width)
+    rows = max(1, BLOCK_PIXELS // width)
+    total = np.empty((rows, width), dtype=dtype)
+
+    for start in range(0, flat_out.shape[0], rows):
+        block = slice(start, start + rows)
+        strip_a, strip_b, out = flat_a[block], flat_b[block], flat_out[block]
+        strip_total = total[:out.shape[0]]
+
+        np.add(strip_a, strip_b, out=strip_total)
+        np.subtract(strip_a, strip_b, out=out)
+        # Zero or non-finite denominators come out as inf/NaN and are cleared below
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(out, strip_total, out=out)
+
+        invalid = ~np.isfinite(out)
+        if nodata is not None:
+            invalid |= (strip_a == nodata) | (strip_b == nodata)
+        if flat_valid is not None:
+            invalid |= ~flat_valid[block]
+        out[invalid] = np.nan
+
+    return result
+
+
+def ndvi(red, nir, nodata=None, valid=None):
+    """Normalized Difference Vegetation Index from red and NIR bands"""
+    return normalized_difference(nir, red, nodata=nodata, valid=valid)
+
+
+def ndmi(nir, swir, nodata=None, valid=None):
+    """Normalized Difference Moisture Index from NIR and SWIR bands"""
+    return normalized_difference(nir, swir, nodata=nodata, valid=valid)
+
+
+def zone_window(shape, center, radius_px):
+    """Slices of the bounding box around a circular zone, plus the circle mask inside it"""
+    rows, cols = shape[-2], shape[-1]
+    row, col = center
+    top, bottom = max(0, row - radius_px), min(rows, row + radius_px + 1)
+    left, right = max(0, col - radius_px), min(cols, col + radius_px + 1)
+
+    yy, xx = np.ogrid[top:bottom, left:right]
+    circle = (yy - row) ** 2 + (xx - col) ** 2 <= radius_px ** 2
+    return (slice(top, bottom), slice(left, right)), circle
+
+
+def zonal_stats(index, zone=None, percentiles=DEFAULT_PERCENTILES):
+    """Mean, min, max, percentiles and valid-pixel fraction over the last two axes
+
+    `index` is a (..., H, W) raster or stack of rasters with NaN for invalid
+    pixels; `zone` is an optional boolean (H, W) mask. Leading axes are kept,
+    so a (T, H, W) stack yields arrays of length T in one pass.
+    """
+    index = np.asarray(index, dtype=np.float32)
+    if zone is not None:
+        index = np.where(zone, index, np.nan)
+        zone_pixels = int(np.count_nonzero(zone))
+    else:
+        zone_pixels = index.shape[-2] * index.shape[-1]
+
+    if index.ndim == 2:
+        # Single raster: compress to the valid pixels once and use the plain reductions
+        values = index[np.isfinite(index)]
+        stats = {'valid_fraction': values.size / max(zone_pixels, 1), 'pixels': int(values.size)}
+        if values.size == 0:
+            return {**stats, 'mean': float('nan'), 'min': float('nan'), 'max': float('nan'),
+                    **{f"p{p}": float('nan') for p in percentiles}}
+        stats.update({'mean': float(values.mean(dtype=np.float64)), 'min': float(values.min()), 'max': float(values.max())})
+        for p, value in zip(percentiles, np.percentile(values, percentiles)):
+            stats[f"p{p}"] = float(value)
+        return stats
+
+    axes = (-2, -1)
+    valid = np.count_nonzero(np.isfinite(index), axis=axes)
+    stats = {'valid_fraction': valid / max(zone_pixels, 1), 'pixels': valid}
+
+    # All-NaN zones (fully clouded scenes) legitimately produce NaN statistics
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        stats['mean'] = np.nanmean(index, axis=axes)
+        stats['min'] = np.nanmin(index, axis=axes)
+        stats['max'] = np.nanmax(index, axis=axes)
+        for p, value in zip(percentiles, np.nanpercentile(index, percentiles, axis=axes)):
+            stats[f"p{p}"] = value
+    return stats
+
+
+def scene_statistics(bands, center=None, radius_px=None, nodata=None, percentiles=DEFAULT_PERCENTILES):
+    """NDVI (and NDMI when a SWIR band is present) zonal statistics for one scene or a stack
+
+    Only the window around `center` (row, col) is read from the bands, so the
+    cost depends on the zone size rather than the scene size.
+    """
+    zone = None
+    if center is not None and radius_px is not None:
+        window, zone = zone_window(np.shape(bands['red']), center, radius_px)
+        bands = {name: np.asarray(band)[(..., *window)] for name, band in bands.items()}
+
+    result = {'ndvi': zonal_stats(ndvi(bands['red'], bands['nir'], nodata=nodata), zone, percentiles)}
+    if 'swir' in bands:
+        result['ndmi'] = zonal_stats(ndmi(bands['nir'], bands['swir'], nodata=nodata), zone, percentiles)
+    return result
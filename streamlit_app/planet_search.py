@@ -0,0 +1,91 @@
+"""
+Streaming client for the Planet Data API quick-search.
+
+Results are requested newest first and yielded page by page.
+The next page (`_links._next`) is only fetched when the consumer asks for
+more, so a capped consumer never pulls, or holds, the rest of a busy site's
+catalogue.
+"""
+
+PLANET_SEARCH_URL = "https://api.planet.com/data/v1/quick-search"
+DEFAULT_PAGE_SIZE = 250
+DEFAULT_TIMEOUT = 10
+
+
+class PlanetSearchError(Exception):
+    """Raised when a search or page request does not return 200"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Satellite API returned status {status_code}")
+        self.status_code = status_code
+
+
+def build_search_filter(lat, lon, start_date, end_date):
+    """Point + acquisition date filter for PSScene imagery"""
+    return {
+        "item_types": ["PSScene"],
+        "filter": {
+            "type": "AndFilter",
+            "config": [
+                {
+                    "type": "GeometryFilter",
+                    "field_name": "geometry",
+                    "config": {
+                        "type": "Point",
+                        "coordinates": [lon, lat]
+                    }
+                },
+                {
+                    "type": "DateRangeFilter",
+                    "field_name": "acquired",
+                    "config": {
+                        "gte": start_date.strftime("%Y-%m-%dT00:00:00Z"),
+                        "lte": end_date.strftime("%Y-%m-%dT23:59:59Z")
+                    }
+                }
+            ]
+        }
+    }
+
+
+def iter_search_pages(session, payload, headers, page_size=DEFAULT_PAGE_SIZE, timeout=DEFAULT_TIMEOUT,
+                      search_url=PLANET_SEARCH_URL):
+    """Yield lists of features one page at a time, following next links lazily"""
+    response = session.post(
+        search_url,
+        params={'_page_size': page_size, '_sort': 'acquired desc'},
+        json=payload,
+        headers=headers,
+        timeout=timeout
+    )
+
+    while True:
+        if response.status_code != 200:
+            raise PlanetSearchError(response.status_code)
+
+        data = response.json()
+        features = data.get('features', [])
+        next_url = data.get('_links', {}).get('_next')
+        # Drop the parsed page before the consumer resumes us
+        del data
+
+        if features:
+            yield features
+        if not next_url or not features:
+            return
+
+        response = session.get(next_url, headers=headers, timeout=timeout)
+
+
+def iter_search_features(session, payload, headers, limit=None, transform=None, **kwargs):
+    """Flatten the page stream, stopping as soon as `limit` features were yielded"""
+    if limit is not None and limit <= 0:
+        return
+
+    count = 0
+    for page in iter_search_pages(session, payload, headers, **kwargs):
+        for feature in page:
+            yield transform(feature) if transform else feature
+            count += 1
+            if limit is not None and count >= limit:
+                return
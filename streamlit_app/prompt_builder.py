@@ -0,0 +1,204 @@
+"""
+Token-budgeted prompt construction for the Gemini analysis.
+
+Instead of one line per observation, the NDVI series is described by compact
+summary statistics plus a shape-preserving sample (endpoints, extrema and the
+points that bend the curve most), sized so the whole prompt fits a fixed
+token budget. Several sites can be packed into one request that answers with
+a JSON array of per-site verdicts.
+"""
+
+import hashlib
+import json
+import math
+import re
+
+import numpy as np
+
+from geo import quantize_location
+from timeseries import as_series
+
+PROMPT_TEMPLATE_VERSION = 3
+DEFAULT_TOKEN_BUDGET = 1200
+CHARS_PER_TOKEN = 4
+MIN_SERIES_POINTS = 8
+DEFAULT_CACHE_PRECISION = 2
+
+GUIDELINES = """Analysis Guidelines:
+- NDVI > 0.6: Healthy vegetation
+- NDVI 0.3-0.6: Moderate vegetation
+- NDVI < 0.3: Sparse/degraded vegetation
+- Declining NDVI trend indicates deforestation or degradation"""
+
+VERDICT_SCHEMA = """{
+  "summary": "Brief 2-3 sentence summary",
+  "riskLevel": "low|medium|high|critical",
+  "deforestationDetected": boolean,
+  "vegetationHealth": "Description of current vegetation state",
+  "recommendations": ["recommendation1", "recommendation2", "recommendation3"],
+  "confidence": 0.0-1.0
+}"""
+
+SITE_TEMPLATE = """You are an environmental auditor analyzing satellite data for a civic issue report.
+
+Location: {lat}, {lon}
+Issue Description: {description}
+
+{site_data}
+
+{guidelines}
+
+Provide a comprehensive analysis in JSON format:
+{schema}"""
+
+BATCH_TEMPLATE = """You are an environmental auditor analyzing satellite data for {count} civic issue reports.
+
+{sites}
+
+{guidelines}
+
+Return ONLY a JSON array with one object per site, in the same order. Each object has a
+"siteId" field with the site's id plus these fields:
+{schema}"""
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (about four characters per token for this kind of text)"""
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def summarize_series(ndvi_data):
+    """Compact statistics describing the whole NDVI series"""
+    series = as_series(ndvi_data)
+    values = series.ndvi.astype(np.float64)
+    days = series.days()
+    dates = series.date_strings()
+
+    # Least-squares slope, reported per year
+    slope = 0.0
+    if len(values) > 1 and np.ptp(days) > 0:
+        slope = np.polyfit(days, values, 1)[0] * 365
+
+    low, high = int(np.argmin(values)), int(np.argmax(values))
+    return (
+        f"{len(values)} observations {dates[0]} to {dates[-1]}; "
+        f"mean {values.mean():.3f}; min {values[low]:.3f} ({dates[low]}); max {values[high]:.3f} ({dates[high]}); "
+        f"first {values[0]:.3f}; last {values[-1]:.3f}; trend {slope:+.3f}/year"
+    )
+
+
+def downsample_series(ndvi_data, max_points):
+    """Keep at most max_points observations while preserving the curve's shape
+
+    Endpoints and the global extrema are always kept; the remaining slots go
+    to the points that deviate most from a straight line between their
+    neighbours (Visvalingam-style triangle areas), i.e. the change points.
+    """
+    series = as_series(ndvi_data)
+    n = len(series)
+    if n <= max_points:
+        return series
+
+    values = series.ndvi
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1, int(np.argmin(values)), int(np.argmax(values))]] = True
+
+    area = np.abs((values[:-2] - values[1:-1]) + (values[2:] - values[1:-1])) / 2
+    ranked = np.argsort(-area, kind='stable') + 1
+    ranked = ranked[~keep[ranked]]
+    keep[ranked[:max(0, max_points - int(keep.sum()))]] = True
+
+    return series.take(keep)
+
+
+def _series_lines(series):
+    return "\n".join(f"{date}: {value:.3f}" for date, value in zip(series.date_strings(), series.ndvi))
+
+
+def _site_data(ndvi_data, budget_tokens):
+    """Summary plus as many sampled points as fit in budget_tokens"""
+    series = as_series(ndvi_data)
+    summary = f"NDVI Summary: {summarize_series(series)}"
+    header_tokens = estimate_tokens(summary) + 12
+    per_line = estimate_tokens("2024-01-01: 0.000\n")
+    max_points = max(MIN_SERIES_POINTS, (budget_tokens - header_tokens) // max(per_line, 1))
+
+    sample = downsample_series(series, max_points)
+    label = "NDVI Data (Vegetation Health)" if len(sample) == len(series) else \
+        f"NDVI Data (Vegetation Health, {len(sample)} of {len(series)} points keeping extrema and change points)"
+    return f"{summary}\n\n{label}:\n{_series_lines(sample)}"
+
+
+def build_site_prompt(ndvi_data, location, description, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Single-site analysis prompt that fits within token_budget"""
+    frame = SITE_TEMPLATE.format(
+        lat=location['lat'], lon=location['lon'], description=description,
+        site_data="", guidelines=GUIDELINES, schema=VERDICT_SCHEMA
+    )
+    return SITE_TEMPLATE.format(
+        lat=location['lat'], lon=location['lon'], description=description,
+        site_data=_site_data(ndvi_data, token_budget - estimate_tokens(frame)),
+        guidelines=GUIDELINES, schema=VERDICT_SCHEMA
+    )
+
+
+def build_batch_prompt(sites, token_budget=None):
+    """One prompt covering several sites; sites are dicts with id, ndvi_data, location, description"""
+    token_budget = token_budget or DEFAULT_TOKEN_BUDGET * len(sites)
+    frame = BATCH_TEMPLATE.format(count=len(sites), sites="", guidelines=GUIDELINES, schema=VERDICT_SCHEMA)
+    per_site = (token_budget - estimate_tokens(frame)) // max(len(sites), 1)
+
+    blocks = []
+    for site in sites:
+        heading = (
+            f"### Site {site['id']}\n"
+            f"Location: {site['location']['lat']}, {site['location']['lon']}\n"
+            f"Issue Description: {site['description']}"
+        )
+        blocks.append(f"{heading}\n{_site_data(site['ndvi_data'], per_site - estimate_tokens(heading))}")
+
+    return BATCH_TEMPLATE.format(count=len(sites), sites="\n\n".join(blocks), guidelines=GUIDELINES, schema=VERDICT_SCHEMA)
+
+
+def parse_batch_response(text, site_ids):
+    """Map site id to verdict from a JSON-array answer; missing sites are left out"""
+    match = re.search(r'\[[\s\S]*\]', text)
+    if not match:
+        return {}
+
+    verdicts = json.loads(match.group(0))
+    by_id = {}
+    for position, verdict in enumerate(verdicts):
+        if not isinstance(verdict, dict):
+            continue
+        site_id = str(verdict.pop('siteId', ''))
+        if site_id not in site_ids and position < len(site_ids):
+            site_id = site_ids[position]
+        if site_id in site_ids:
+            by_id[site_id] = verdict
+    return by_id
+
+
+def normalize_description(description):
+    """Issue description with case and whitespace differences removed"""
+    return " ".join(str(description or "").split()).casefold()
+
+
+def analysis_cache_key(model_name, location, ndvi_data, description="", precision=DEFAULT_CACHE_PRECISION):
+    """Content hash identifying an analysis: model, template version, quantized location, issue, rounded series
+
+    Series that only differ below `precision` decimal places hash the same,
+    so a re-run of the same audit reuses the earlier verdict. The reported
+    issue is part of the prompt and the verdict, so a different complaint at
+    the same site gets its own.
+    """
+    series = as_series(ndvi_data)
+    payload = json.dumps([
+        model_name,
+        PROMPT_TEMPLATE_VERSION,
+        quantize_location(location['lat'], location['lon']),
+        normalize_description(description),
+        series.date_strings().tolist(),
+        np.round(series.ndvi.astype(np.float64), precision).tolist(),
+    ], separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
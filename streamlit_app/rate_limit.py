@@ -0,0 +1,269 @@
+"""
+Token-bucket rate limiting for the external providers.
+
+Every call to Planet, OpenWeather, EONET or Gemini first takes a token from
+the bucket of its provider and API key. Buckets are process-wide, so all
+sessions of the app share each key's quota. Callers that find a bucket
+empty queue for a token, interactive audits ahead of batch work, and give
+up with RateLimitExceeded once their queueing deadline can no longer be
+met. A 429 closes the bucket for the provider's Retry-After (or
+DEFAULT_RETRY_AFTER when it gives none), so every caller backs off instead
+of only the one that was refused.
+
+Wait times are recorded on the tracer as `ratelimit.<provider>` stages, so
+they show up in the profiler and in the Prometheus export; rejections count
+as errors of that stage.
+"""
+
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+
+from tracing import get_tracer
+
+# Priority lanes; lower goes first
+INTERACTIVE = 0
+BATCH = 1
+LANES = {'interactive': INTERACTIVE, 'batch': BATCH}
+
+# (tokens per second, burst) per provider and API key, after the providers' documented limits;
+# override with RATE_LIMITS="planet=5:10,gemini=0.25:3" (a rate of 0 turns a provider's limit off)
+DEFAULT_LIMITS = {
+    'planet': (5.0, 10),        # Data API search: 5 requests/s
+    'weather': (1.0, 10),       # OpenWeather free plan: 60 calls/min
+    'eonet': (2.0, 5),
+    'gemini': (0.25, 3),        # Gemini free tier: 15 requests/min
+}
+
+# Longest a caller queues for a token, per lane (seconds)
+DEFAULT_QUEUE_DEADLINES = {INTERACTIVE: 10.0, BATCH: 120.0}
+
+DEFAULT_RETRY_AFTER = 5     # cool-down after a 429 without a usable Retry-After
+MAX_RETRY_AFTER = 300
+RATE_LIMIT_RETRIES = 2      # times a request refused with 429 is sent again after the cool-down
+
+_lane = ContextVar('cludo_rate_lane', default=None)
+_default_lane = INTERACTIVE
+
+
+class RateLimitExceeded(Exception):
+    """No token could be had for a provider within the caller's queueing deadline"""
+
+    def __init__(self, provider, waited):
+        super().__init__(f"{provider} rate limit: no request slot within {waited:.1f}s")
+        self.provider = provider
+        self.waited = waited
+
+
+def parse_limits(text):
+    """{provider: (rate, burst)} from 'planet=5:10,gemini=0.25' (burst defaults to one second of rate)"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(','))):
+        provider, _, spec = item.partition('=')
+        rate, _, burst = spec.partition(':')
+        rate = float(rate)
+        limits[provider.strip()] = (rate, int(burst) if burst else max(1, int(rate)))
+    return limits
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), capped; None if absent or invalid"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - (time.time() if now is None else now)
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class TokenBucket:
+    """Token bucket whose waiters are served in (lane, arrival) order, with a cool-down window"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._waiters = []
+        self._arrivals = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        # updated is in the future while a cool-down runs
+        if now <= self.updated:
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _ready_at(self, entry, now):
+        # When this waiter should get a token if everyone ahead of it takes one first
+        ahead = sum(1 for other in self._waiters if other < entry)
+        missing = ahead + 1 - self.tokens
+        return max(self.blocked_until, now + (missing / self.rate if missing > 0 else 0.0))
+
+    def acquire(self, lane=INTERACTIVE, timeout=None):
+        """Take one token, waiting up to timeout seconds; False if it cannot be had in time"""
+        now = time.monotonic()
+        deadline = None if timeout is None else now + timeout
+        entry = (lane, next(self._arrivals))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == entry and now >= self.blocked_until and self.tokens >= 1:
+                        heapq.heappop(self._waiters)
+                        self.tokens -= 1
+                        return True
+
+                    ready_at = self._ready_at(entry, now)
+                    if deadline is not None and ready_at > deadline:
+                        # Give up now rather than sit in the queue past the deadline
+                        return False
+                    self._cond.wait(max(ready_at - now, 0.001))
+            finally:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def penalize(self, seconds):
+        """Hand out nothing for the next seconds, then restart from an empty bucket"""
+        with self._cond:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = max(self.updated, self.blocked_until)
+            self._cond.notify_all()
+
+    @property
+    def queued(self):
+        with self._cond:
+            return len(self._waiters)
+
+
+class RateLimiter:
+    """Buckets per (provider, API key), shared by every caller in the process"""
+
+    def __init__(self, limits=None, deadlines=None, share=1.0, tracer=None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.deadlines = {**DEFAULT_QUEUE_DEADLINES, **(deadlines or {})}
+        # Processes splitting one quota (batch workers) each get their share of the rate
+        self.share = share
+        self.tracer = tracer or get_tracer()
+        self._buckets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, provider, key=None):
+        """Bucket for a provider and key, or None if the provider is not limited"""
+        limit = self.limits.get(provider)
+        if limit is None or limit[0] <= 0:
+            return None
+        # Keys are only kept as digests
+        bucket_key = (provider, hashlib.sha256((key or "").encode()).hexdigest()[:16])
+        with self._lock:
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                rate, burst = limit
+                bucket = self._buckets[bucket_key] = TokenBucket(rate * self.share, max(1, int(burst * self.share)))
+            return bucket
+
+    def acquire(self, provider, key=None, lane=None, timeout=None):
+        """Wait for a request slot; returns the seconds waited or raises RateLimitExceeded"""
+        bucket = self.bucket(provider, key)
+        if bucket is None:
+            return 0.0
+        lane = current_lane() if lane is None else lane
+        timeout = self.deadlines.get(lane) if timeout is None else timeout
+
+        started = time.perf_counter()
+        granted = bucket.acquire(lane, timeout)
+        waited = time.perf_counter() - started
+        self.tracer.observe(f"ratelimit.{provider}", waited, error=not granted)
+        self._count(provider, 'granted' if granted else 'rejected', waited)
+        if not granted:
+            raise RateLimitExceeded(provider, waited)
+        return waited
+
+    def penalize(self, provider, key=None, retry_after=None):
+        """Close a provider key's bucket after a 429, for Retry-After seconds"""
+        bucket = self.bucket(provider, key)
+        if bucket is None:
+            return
+        bucket.penalize(DEFAULT_RETRY_AFTER if retry_after is None else retry_after)
+        self._count(provider, 'throttled')
+
+    def stats(self):
+        """{provider: granted, rejected, throttled (429s), total and longest wait, currently queued}"""
+        with self._lock:
+            stats = {provider: dict(counts) for provider, counts in self._stats.items()}
+            buckets = list(self._buckets.items())
+        for (provider, _), bucket in buckets:
+            if provider in stats:
+                stats[provider]['queued'] = stats[provider].get('queued', 0) + bucket.queued
+        return stats
+
+    def _count(self, provider, outcome, waited=0.0):
+        with self._lock:
+            counts = self._stats.setdefault(
+                provider, {'granted': 0, 'rejected': 0, 'throttled': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+            counts[outcome] += 1
+            counts['wait_total'] += waited
+            counts['wait_max'] = max(counts['wait_max'], waited)
+
+
+def current_lane():
+    """Lane of the code currently running (interactive unless set otherwise)"""
+    lane = _lane.get()
+    return _default_lane if lane is None else lane
+
+
+@contextmanager
+def lane(name):
+    """Run the block's provider calls in the given lane ('interactive' or 'batch')"""
+    token = _lane.set(LANES[name])
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def _limits_from_env():
+    return {**DEFAULT_LIMITS, **parse_limits(os.getenv("RATE_LIMITS"))}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def configure(share=None, default_lane=None):
+    """Set this process's share of every quota and the lane of calls that do not pick one (e.g. in batch workers)"""
+    global _limiter, _default_lane
+    if default_lane is not None:
+        _default_lane = LANES[default_lane]
+    if share is not None:
+        with _limiter_lock:
+            _limiter = RateLimiter(_limits_from_env(), share=share)
+
+
+def get_limiter():
+    """Process-wide limiter, configured from RATE_LIMITS on first use"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(_limits_from_env())
+    return _limiter
@@ -0,0 +1,449 @@
+"""
+Local stand-ins for the external providers, for benchmarks and offline tests.
+
+Each provider runs its own threaded HTTP server on 127.0.0.1 with a
+configurable latency (plus jitter), error rate and payload size, and answers
+with responses shaped like the real API, so the app's own fetch, parsing,
+retry and streaming code is what gets measured:
+
+- Planet quick-search: paginated scenes (`size` = scenes per search)
+- OpenWeather current weather (`size` = extra response bytes)
+- NASA EONET open events with ETag support (`size` = number of events)
+- Gemini: a schema-shaped verdict streamed as NDJSON chunks (`size` =
+  characters of generated text), used through StubGeminiModel
+
+Responses are deterministic for a given request and seed; failures (503)
+are drawn from a seeded generator per server.
+"""
+
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+PROVIDERS = ('planet', 'weather', 'eonet', 'gemini')
+
+# Defaults shaped after production: latency in ms, error rate per request, provider-specific size and
+# quota_rps, the requests per second answered before the stub starts returning 429 (0 = no quota)
+DEFAULT_SETTINGS = {
+    'planet': {'latency_ms': 350, 'jitter_ms': 150, 'error_rate': 0.02, 'size': 600, 'quota_rps': 0},
+    'weather': {'latency_ms': 120, 'jitter_ms': 60, 'error_rate': 0.01, 'size': 0, 'quota_rps': 0},
+    'eonet': {'latency_ms': 400, 'jitter_ms': 200, 'error_rate': 0.01, 'size': 300, 'quota_rps': 0},
+    'gemini': {'latency_ms': 900, 'jitter_ms': 300, 'error_rate': 0.02, 'size': 1200, 'chunk_interval_ms': 40,
+               'quota_rps': 0},
+}
+
+PLANET_SEARCH_PATH = "/data/v1/quick-search"
+PLANET_PAGE_PATH = "/data/v1/searches/page"
+WEATHER_PATH = "/data/2.5/weather"
+EONET_PATH = "/api/v3/events"
+GEMINI_PATH = "/v1beta/models/"
+GEMINI_CHUNK_CHARS = 80
+
+
+class StubRequest:
+    """The parts of an HTTP request a route handler needs"""
+
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b"{}")
+
+    def param(self, name, default=None):
+        return self.query.get(name, [default])[0]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _handle(self):
+        stub = self.server.stub
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        request = StubRequest(self.command, parsed.path, parse_qs(parsed.query), self.headers,
+                              self.rfile.read(length) if length else b"")
+
+        if stub.over_quota():
+            return self._send(429, {'Content-Type': 'application/json', 'Retry-After': '1'}, b'{"error": "quota exceeded"}')
+        stub.wait()
+        if stub.should_fail():
+            return self._send(503, {'Content-Type': 'application/json'}, b'{"error": "stub failure"}')
+
+        route = stub.route(request)
+        if route is None:
+            return self._send(404, {'Content-Type': 'application/json'}, b'{"error": "not found"}')
+        status, headers, body = route(stub, request)
+        self._send(status, headers, body)
+
+    def _send(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if isinstance(body, (bytes, bytearray)):
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # Generators are streamed with chunked transfer encoding
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in body:
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-stream (e.g. a parsed verdict stops reading) are expected
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """One provider stand-in with latency, jitter, error rate and payload size knobs"""
+
+    def __init__(self, name, routes, latency_ms=0, jitter_ms=0, error_rate=0.0, size=0, seed=0, quota_rps=0,
+                 **options):
+        self.name = name
+        self.routes = routes
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.size = size
+        self.seed = seed
+        self.quota_rps = quota_rps
+        self.options = options
+        self.stats = {}
+        self.reset_stats()
+        self._window = None
+        self._window_requests = 0
+        self._rng = random.Random(f"{name}:{seed}")
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, request):
+        for prefix, handler in self.routes:
+            if request.path.startswith(prefix):
+                return handler
+        return None
+
+    def wait(self):
+        with self._lock:
+            self.stats['requests'] += 1
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        delay = max(0.0, self.latency_ms + jitter) / 1000
+        if delay:
+            time.sleep(delay)
+
+    def reset_stats(self):
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+
+    def over_quota(self):
+        """True once quota_rps requests were answered in the current one-second window"""
+        if not self.quota_rps:
+            return False
+        with self._lock:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window, self._window_requests = window, 0
+            self._window_requests += 1
+            over = self._window_requests > self.quota_rps
+            if over:
+                self.stats['throttled'] += 1
+        return over
+
+    def should_fail(self):
+        with self._lock:
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if failed:
+                self.stats['errors'] += 1
+        return failed
+
+    def start(self):
+        self._server = _HTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"stub-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _json_response(data, status=200, headers=None):
+    return status, {'Content-Type': 'application/json', **(headers or {})}, json.dumps(data).encode()
+
+
+def _digest(*parts):
+    return int.from_bytes(hashlib.sha256("|".join(map(str, parts)).encode()).digest()[:8], 'little')
+
+
+# Planet
+
+def _date_range(payload):
+    for condition in payload.get('filter', {}).get('config', []):
+        if condition.get('type') == 'DateRangeFilter':
+            config = condition['config']
+            return config['gte'][:10], config['lte'][:10]
+    return "2023-01-01", "2023-12-31"
+
+
+def _scene(index, count, gte, lte, seed):
+    start = datetime.strptime(gte, '%Y-%m-%d')
+    span = max((datetime.strptime(lte, '%Y-%m-%d') - start).total_seconds(), 1)
+    acquired = start + timedelta(seconds=span * (index + 0.5) / count)
+    rng = random.Random(_digest(seed, gte, index))
+    cloud_cover = round(rng.random() ** 2, 2)
+    lon, lat = rng.uniform(-60, -59), rng.uniform(-3, -2)
+    return {
+        'type': 'Feature',
+        'id': f"{acquired:%Y%m%d_%H%M%S}_{index:04d}_2{rng.randrange(100):02d}c",
+        'geometry': {
+            'type': 'Polygon',
+            'coordinates': [[[lon, lat], [lon + 0.2, lat], [lon + 0.2, lat + 0.1], [lon, lat + 0.1], [lon, lat]]],
+        },
+        'properties': {
+            'acquired': acquired.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'item_type': 'PSScene',
+            'cloud_cover': cloud_cover,
+            'clear_percent': int(round((1 - cloud_cover) * 100)),
+            'clear_confidence_percent': rng.randrange(70, 100),
+            'heavy_haze_percent': 0,
+            'visible_percent': rng.randrange(80, 101),
+            'gsd': round(rng.uniform(3.5, 4.2), 1),
+            'instrument': 'PSB.SD',
+            'satellite_id': f"24{rng.randrange(100):02d}",
+            'sun_azimuth': round(rng.uniform(40, 140), 1),
+            'sun_elevation': round(rng.uniform(30, 70), 1),
+            'view_angle': round(rng.uniform(0, 5), 1),
+            'publishing_stage': 'finalized',
+            'quality_category': 'standard',
+        },
+        '_permissions': ['assets.basic_analytic_4b:download', 'assets.ortho_analytic_4b_sr:download'],
+    }
+
+
+def _planet_page(stub, gte, lte, offset, page_size, sort):
+    count = stub.size
+    positions = range(offset, min(offset + page_size, count))
+    if sort == 'acquired desc':
+        positions = [count - 1 - i for i in positions]
+    features = [_scene(i, count, gte, lte, stub.seed) for i in positions]
+    links = {}
+    if offset + page_size < count:
+        query = urlencode({'gte': gte, 'lte': lte, 'offset': offset + page_size, '_page_size': page_size,
+                           '_sort': sort})
+        links['_next'] = f"{stub.url}{PLANET_PAGE_PATH}?{query}"
+    return _json_response({'type': 'FeatureCollection', 'features': features, '_links': links})
+
+
+def planet_search(stub, request):
+    gte, lte = _date_range(request.json())
+    return _planet_page(stub, gte, lte, 0, int(request.param('_page_size', 250)),
+                        request.param('_sort', 'acquired asc'))
+
+
+def planet_next_page(stub, request):
+    return _planet_page(stub, request.param('gte'), request.param('lte'),
+                        int(request.param('offset', 0)), int(request.param('_page_size', 250)),
+                        request.param('_sort', 'acquired asc'))
+
+
+# OpenWeather
+
+def weather(stub, request):
+    lat, lon = float(request.param('lat', 0)), float(request.param('lon', 0))
+    rng = random.Random(_digest(round(lat, 3), round(lon, 3)))
+    data = {
+        'coord': {'lon': lon, 'lat': lat},
+        'weather': [{'id': 803, 'main': 'Clouds', 'description': 'broken clouds', 'icon': '04d'}],
+        'base': 'stations',
+        'main': {
+            'temp': round(rng.uniform(15, 35), 2),
+            'feels_like': round(rng.uniform(15, 38), 2),
+            'pressure': rng.randrange(1000, 1020),
+            'humidity': rng.randrange(30, 95),
+        },
+        'visibility': 10000,
+        'wind': {'speed': round(rng.uniform(0, 8), 2), 'deg': rng.randrange(360)},
+        'clouds': {'all': rng.randrange(101)},
+        'dt': 1700000000,
+        'name': 'Stub',
+        'cod': 200,
+    }
+    if stub.size:
+        data['padding'] = "x" * stub.size
+    return _json_response(data)
+
+
+# EONET
+
+def eonet_events(stub, request):
+    etag = f'"{stub.size}-{stub.seed}"'
+    if request.headers.get('If-None-Match') == etag:
+        return 304, {'ETag': etag}, b""
+
+    rng = random.Random(_digest('eonet', stub.size, stub.seed))
+    events = []
+    for i in range(stub.size):
+        points = [{
+            'date': f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T00:00:00Z",
+            'type': 'Point',
+            'coordinates': [round(rng.uniform(-180, 180), 3), round(rng.uniform(-60, 70), 3)],
+        } for _ in range(rng.randrange(1, 6))]
+        events.append({
+            'id': f"EONET_{i}",
+            'title': f"Stub event {i}",
+            'description': None,
+            'link': f"https://eonet.gsfc.nasa.gov/api/v3/events/EONET_{i}",
+            'closed': None,
+            'categories': [{'id': 'wildfires', 'title': 'Wildfires'}],
+            'sources': [{'id': 'InciWeb', 'url': 'https://inciweb.nwcg.gov/'}],
+            'geometry': points,
+        })
+    return _json_response({'title': 'EONET Events', 'events': events}, headers={'ETag': etag})
+
+
+# Gemini
+
+def _verdict(prompt, size):
+    rng = random.Random(_digest(prompt))
+    verdict = {
+        'riskLevel': rng.choice(['low', 'medium', 'high', 'critical']),
+        'summary': "Stub analysis of the supplied NDVI series.",
+        'deforestationDetected': rng.random() < 0.3,
+        'vegetationHealth': "Moderate vegetation cover with a gradual decline.",
+        'recommendations': [],
+        'confidence': round(rng.uniform(0.5, 0.95), 2),
+    }
+    text = json.dumps(verdict)
+    while len(text) < size:
+        verdict['recommendations'].append(f"Recommendation {len(verdict['recommendations']) + 1}: "
+                                          "schedule a field survey of the affected area.")
+        text = json.dumps(verdict)
+    return text
+
+
+def gemini_generate(stub, request):
+    text = _verdict(request.json().get('prompt', ''), stub.size)
+    interval = stub.options.get('chunk_interval_ms', 0) / 1000
+
+    def chunks():
+        for start in range(0, len(text), GEMINI_CHUNK_CHARS):
+            if start and interval:
+                time.sleep(interval)
+            yield (json.dumps({'text': text[start:start + GEMINI_CHUNK_CHARS]}) + "\n").encode()
+
+    return 200, {'Content-Type': 'application/x-ndjson'}, chunks()
+
+
+ROUTES = {
+    'planet': [(PLANET_SEARCH_PATH, planet_search), (PLANET_PAGE_PATH, planet_next_page)],
+    'weather': [(WEATHER_PATH, weather)],
+    'eonet': [(EONET_PATH, eonet_events)],
+    'gemini': [(GEMINI_PATH, gemini_generate)],
+}
+
+
+class StubChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubQuotaError(RuntimeError):
+    """429 from the Gemini stub, with the code and retry delay google.api_core errors expose"""
+
+    code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("Gemini stub quota exceeded")
+        self.retry_after = retry_after
+
+
+class StubGeminiModel:
+    """GenerativeModel look-alike that talks to the Gemini stub server"""
+
+    def __init__(self, base_url, model_name, session=None, timeout=60):
+        import requests
+
+        self.url = f"{base_url}{GEMINI_PATH}{model_name.split('/')[-1]}:streamGenerateContent"
+        self.model_name = model_name
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def _stream(self, prompt, generation_config, timeout=None):
+        response = self.session.post(self.url, json={'prompt': prompt, 'generation_config': generation_config},
+                                     stream=True, timeout=timeout or self.timeout)
+        if response.status_code == 429:
+            response.close()
+            raise StubQuotaError(float(response.headers.get('Retry-After', 1)))
+        if response.status_code != 200:
+            response.close()
+            raise RuntimeError(f"Gemini stub returned status {response.status_code}")
+        for line in response.iter_lines():
+            if line:
+                yield StubChunk(json.loads(line)['text'])
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        # Accepts the SDK's request_options; only the timeout applies to the stub
+        chunks = self._stream(prompt, generation_config, (request_options or {}).get('timeout'))
+        if stream:
+            return chunks
+        return StubChunk("".join(chunk.text for chunk in chunks))
+
+
+def start_stub_servers(settings=None, seed=0):
+    """Start one server per provider; returns {provider: StubServer}"""
+    servers = {}
+    for provider in PROVIDERS:
+        config = {**DEFAULT_SETTINGS[provider], **(settings or {}).get(provider, {})}
+        servers[provider] = StubServer(provider, ROUTES[provider], seed=seed, **config).start()
+    return servers
+
+
+def stub_environment(servers):
+    """Environment variables that point app.py at the stub servers"""
+    return {
+        'PLANET_SEARCH_URL': servers['planet'].url + PLANET_SEARCH_PATH,
+        'WEATHER_API_URL': servers['weather'].url + WEATHER_PATH,
+        'EONET_EVENTS_URL': servers['eonet'].url + EONET_PATH + "?status=open",
+        'SATELLITE_API_KEY': 'stub',
+        'WEATHER_API_KEY': 'stub',
+        'GEMINI_API_KEY': 'stub',
+        # The client limits itself to the stub quotas (none by default)
+        'RATE_LIMITS': ",".join(f"{name}={server.quota_rps}:1" for name, server in servers.items()),
+    }
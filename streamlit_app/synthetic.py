@@ -0,0 +1,108 @@
+"""
+Deterministic synthetic NDVI generator.
+
+Every random draw is a counter-based hash of (site seed, stream, observation
+index), so a site's series depends only on its seed, which is derived from
+its location and date range, never on global random state or on which
+other sites are generated alongside it. Everything is computed on whole
+(sites, T) arrays, fast enough for load tests with millions of site-days.
+
+Signal model per site: base level + linear decline + annual cycle + noise,
+optionally with an abrupt deforestation drop and cloud gaps (NaN).
+"""
+
+import hashlib
+
+import numpy as np
+
+from geo import quantize_location
+from timeseries import SatelliteSeries
+
+DAYS_PER_YEAR = 365.25
+NDVI_FLOOR = 0.05
+NDVI_CEILING = 0.95
+
+# Independent random streams derived from one site seed
+_BASE, _PHASE, _NOISE, _NOISE_ANGLE, _CLOUD, _EVENT, _EVENT_TIME = range(7)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MASK_53 = np.uint64((1 << 53) - 1)
+
+
+def location_seed(lat, lon, start_date, end_date):
+    """Stable 64-bit seed for a site and date range"""
+    raw = f"{quantize_location(lat, lon)}|{str(start_date)[:10]}|{str(end_date)[:10]}"
+    return int.from_bytes(hashlib.sha256(raw.encode()).digest()[:8], 'little')
+
+
+def observation_dates(start_date, end_date, cadence_days=30):
+    """Observation timestamps from start to end (inclusive) every cadence_days"""
+    start = np.datetime64(start_date, 's')
+    end = np.datetime64(end_date, 's')
+    return np.arange(start, end + 1, np.timedelta64(int(cadence_days * 86400), 's'))
+
+
+def _splitmix64(x):
+    with np.errstate(over='ignore'):
+        x = x + _GOLDEN
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def _uniform(seeds, stream, index=None):
+    """Uniform [0, 1) draws: one per seed, or one per (seed, index) when index is given"""
+    with np.errstate(over='ignore'):
+        key = _splitmix64(seeds ^ (np.uint64(stream) * _GOLDEN))
+        if index is not None:
+            key = _splitmix64(key[:, None] + np.asarray(index, dtype=np.uint64)[None, :])
+    return (key >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def synthesize_ndvi(seeds, dates, base_ndvi=None, decline_per_year=0.15, seasonal_amplitude=0.08,
+                    noise=0.03, cloud_gap_rate=0.0, event_rate=0.0, event_drop=0.3):
+    """NDVI for many sites on a shared timeline
+
+    Returns {'ndvi': (sites, T) float32 with NaN for cloud gaps,
+    'event_index': (sites,) index of the first observation after an injected
+    deforestation event, or -1}. `base_ndvi=None` draws a per-site base
+    level between 0.55 and 0.8.
+    """
+    seeds = np.atleast_1d(np.asarray(seeds, dtype=np.uint64))
+    count = len(dates)
+    index = np.arange(count, dtype=np.uint64)
+    years = ((dates - dates[0]) / np.timedelta64(1, 'D') / DAYS_PER_YEAR) if count else np.empty(0)
+
+    if base_ndvi is None:
+        base = 0.55 + 0.25 * _uniform(seeds, _BASE)
+    else:
+        base = np.full(len(seeds), float(base_ndvi))
+    phase = 2 * np.pi * _uniform(seeds, _PHASE)
+
+    ndvi = base[:, None] - decline_per_year * years[None, :]
+    if seasonal_amplitude:
+        ndvi += seasonal_amplitude * np.sin(2 * np.pi * years[None, :] + phase[:, None])
+    if noise:
+        # Box-Muller on two independent hash streams
+        radius = np.sqrt(-2 * np.log1p(-_uniform(seeds, _NOISE, index)))
+        ndvi += noise * radius * np.cos(2 * np.pi * _uniform(seeds, _NOISE_ANGLE, index))
+
+    event_index = np.full(len(seeds), -1)
+    if event_rate and count > 1:
+        has_event = _uniform(seeds, _EVENT) < event_rate
+        at = 1 + (_uniform(seeds, _EVENT_TIME) * (count - 1)).astype(int)
+        event_index = np.where(has_event, at, -1)
+        ndvi -= event_drop * (has_event[:, None] & (np.arange(count)[None, :] >= at[:, None]))
+
+    ndvi = np.clip(ndvi, NDVI_FLOOR, NDVI_CEILING).astype(np.float32)
+    if cloud_gap_rate:
+        ndvi[_uniform(seeds, _CLOUD, index) < cloud_gap_rate] = np.nan
+
+    return {'ndvi': ndvi, 'event_index': event_index}
+
+
+def synthetic_series(lat, lon, start_date, end_date, cadence_days=30, source='simulated', **options):
+    """Single-site SatelliteSeries seeded from (lat, lon, date range)"""
+    dates = observation_dates(start_date, end_date, cadence_days)
+    seed = location_seed(lat, lon, start_date, end_date)
+    result = synthesize_ndvi([seed], dates, **options)
+    return SatelliteSeries(dates, source=source, ndvi=result['ndvi'][0])
@@ -0,0 +1,242 @@
+"""
+Local raster tile store with windowed reads.
+
+Each scene is split per band into square tiles saved as plain .npy files and
+opened memory-mapped, so reading the few hundred pixels around an audit point
+only pages in those pixels. A window that falls inside one tile is returned
+as a zero-copy view of the mapped file; a window that straddles tiles is
+assembled into an array of the window's size only.
+
+With a byte budget, the least recently read scenes are deleted once the
+store grows past it.
+
+Scenes are north-up rasters georeferenced with a GDAL-style geotransform
+(x_origin, pixel_width, 0, y_origin, 0, -pixel_height) in degrees.
+"""
+
+import json
+import math
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from cache import CACHE_DIR
+from ndvi_engine import scene_statistics
+
+DEFAULT_TILE_SIZE = 1024
+MAX_OPEN_TILES = 64
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+METERS_PER_DEGREE = 111320.0
+
+
+class Window:
+    """Pixels around an audit point, plus where the point sits inside them"""
+
+    def __init__(self, bands, center, radius_px, geotransform, nodata=None):
+        self.bands = bands
+        self.center = center
+        self.radius_px = radius_px
+        self.geotransform = geotransform
+        self.nodata = nodata
+
+    @property
+    def shape(self):
+        return next(iter(self.bands.values())).shape
+
+    def statistics(self, percentiles=(10, 50, 90)):
+        """NDVI/NDMI zonal statistics for the circular zone inside this window"""
+        return scene_statistics(self.bands, center=self.center, radius_px=self.radius_px,
+                                nodata=self.nodata, percentiles=percentiles)
+
+
+class TileStore:
+    """Chunked, memory-mapped band storage keyed by scene id"""
+
+    def __init__(self, root=None, tile_size=DEFAULT_TILE_SIZE, max_open_tiles=MAX_OPEN_TILES, max_bytes=None):
+        self.root = root or os.path.join(CACHE_DIR, "tiles")
+        self.tile_size = tile_size
+        self.max_open_tiles = max_open_tiles
+        # None leaves eviction to the owning process (decode workers write into a store they do not manage)
+        self.max_bytes = max_bytes
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        self._meta = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _scene_dir(self, scene_id):
+        return os.path.join(self.root, scene_id.replace('/', '_'))
+
+    def has_scene(self, scene_id):
+        return os.path.exists(os.path.join(self._scene_dir(scene_id), "meta.json"))
+
+    def scene_meta(self, scene_id):
+        if scene_id not in self._meta:
+            with open(os.path.join(self._scene_dir(scene_id), "meta.json")) as f:
+                self._meta[scene_id] = json.load(f)
+        return self._meta[scene_id]
+
+    def write_scene(self, scene_id, bands, geotransform, nodata=None):
+        """Split each (H, W) band into tiles and write them with the scene metadata"""
+        shapes = {np.shape(band) for band in bands.values()}
+        if len(shapes) != 1:
+            raise ValueError(f"All bands must share one shape, got {shapes}")
+        rows, cols = shapes.pop()
+
+        scene_dir = self._scene_dir(scene_id)
+        staging = scene_dir + ".partial"
+        shutil.rmtree(staging, ignore_errors=True)
+
+        for name, band in bands.items():
+            band = np.asarray(band)
+            os.makedirs(os.path.join(staging, name))
+            for top in range(0, rows, self.tile_size):
+                for left in range(0, cols, self.tile_size):
+                    tile = band[top:top + self.tile_size, left:left + self.tile_size]
+                    np.save(os.path.join(staging, name, f"{top // self.tile_size}_{left // self.tile_size}.npy"),
+                            np.ascontiguousarray(tile))
+
+        meta = {
+            'scene_id': scene_id,
+            'shape': [rows, cols],
+            'tile_size': self.tile_size,
+            'bands': {name: str(np.asarray(band).dtype) for name, band in bands.items()},
+            'geotransform': list(geotransform),
+            'nodata': nodata,
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # Publish the scene atomically so readers never see half-written tiles
+        self.delete_scene(scene_id)
+        os.replace(staging, scene_dir)
+        self.evict(keep=(scene_id,))
+        return meta
+
+    def touch(self, scene_id):
+        """Mark a scene recently used so eviction keeps it"""
+        try:
+            os.utime(os.path.join(self._scene_dir(scene_id), "meta.json"))
+        except OSError:
+            pass
+
+    def evict(self, keep=()):
+        """Delete the least recently used scenes beyond the byte budget, sparing the scenes in `keep`"""
+        if self.max_bytes is None:
+            return []
+        kept = set(keep)
+
+        scenes = []
+        for name in os.listdir(self.root):
+            meta_path = os.path.join(self.root, name, "meta.json")
+            if name.endswith(".partial"):
+                continue
+            try:
+                used = os.stat(meta_path).st_mtime
+                with open(meta_path) as f:
+                    # Directory names are sanitized ids; scenes written before ids were recorded fall back to them
+                    scene_id = json.load(f).get('scene_id', name)
+            except (OSError, ValueError):
+                continue
+            size = sum(os.path.getsize(os.path.join(d, n)) for d, _, names in os.walk(os.path.join(self.root, name))
+                       for n in names)
+            scenes.append((scene_id in kept, used, size, scene_id))
+
+        total = sum(size for _, _, size, _ in scenes)
+        evicted = []
+        # Kept scenes sort last, so they are only reached once everything else is gone
+        for is_kept, _, size, scene_id in sorted(scenes):
+            if total <= self.max_bytes or is_kept:
+                break
+            self.delete_scene(scene_id)
+            evicted.append(scene_id)
+            total -= size
+        return evicted
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(d, n)) for d, _, names in os.walk(self.root) for n in names)
+
+    def delete_scene(self, scene_id):
+        prefix = self._scene_dir(scene_id) + os.sep
+        with self._lock:
+            for path in [p for p in self._open if p.startswith(prefix)]:
+                del self._open[path]
+        self._meta.pop(scene_id, None)
+        shutil.rmtree(self._scene_dir(scene_id), ignore_errors=True)
+
+    def _tile(self, scene_id, band, tile_row, tile_col):
+        path = os.path.join(self._scene_dir(scene_id), band, f"{tile_row}_{tile_col}.npy")
+        with self._lock:
+            tile = self._open.get(path)
+            if tile is None:
+                tile = np.load(path, mmap_mode='r')
+                self._open[path] = tile
+                while len(self._open) > self.max_open_tiles:
+                    self._open.popitem(last=False)
+            else:
+                self._open.move_to_end(path)
+            return tile
+
+    def pixel_of(self, scene_id, lat, lon):
+        """(row, col) of a coordinate in the scene's pixel grid"""
+        x0, dx, _, y0, _, dy = self.scene_meta(scene_id)['geotransform']
+        return int(math.floor((lat - y0) / dy)), int(math.floor((lon - x0) / dx))
+
+    def radius_in_pixels(self, scene_id, lat, buffer_m):
+        _, dx, _, _, _, dy = self.scene_meta(scene_id)['geotransform']
+        px_width = abs(dx) * METERS_PER_DEGREE * math.cos(math.radians(lat))
+        px_height = abs(dy) * METERS_PER_DEGREE
+        return max(1, int(math.ceil(buffer_m / min(px_width, px_height))))
+
+    def read_region(self, scene_id, top, left, bottom, right, bands=None):
+        """Read rows [top, bottom) and cols [left, right) of each band"""
+        meta = self.scene_meta(scene_id)
+        size = meta['tile_size']
+        names = bands or list(meta['bands'])
+        first_row, last_row = top // size, (bottom - 1) // size
+        first_col, last_col = left // size, (right - 1) // size
+
+        result = {}
+        for name in names:
+            if first_row == last_row and first_col == last_col:
+                # Zero-copy: a view straight into the memory-mapped tile
+                tile = self._tile(scene_id, name, first_row, first_col)
+                result[name] = tile[top - first_row * size:bottom - first_row * size,
+                                    left - first_col * size:right - first_col * size]
+                continue
+
+            out = np.empty((bottom - top, right - left), dtype=meta['bands'][name])
+            for tile_row in range(first_row, last_row + 1):
+                for tile_col in range(first_col, last_col + 1):
+                    tile = self._tile(scene_id, name, tile_row, tile_col)
+                    t_top, t_left = tile_row * size, tile_col * size
+                    r0, r1 = max(top, t_top), min(bottom, t_top + tile.shape[0])
+                    c0, c1 = max(left, t_left), min(right, t_left + tile.shape[1])
+                    out[r0 - top:r1 - top, c0 - left:c1 - left] = tile[r0 - t_top:r1 - t_top, c0 - t_left:c1 - t_left]
+            result[name] = out
+        return result
+
+    def read_window(self, scene_id, lat, lon, buffer_m, bands=None):
+        """Pixels within buffer_m metres of (lat, lon), or None if the point is off the scene"""
+        meta = self.scene_meta(scene_id)
+        self.touch(scene_id)
+        rows, cols = meta['shape']
+        row, col = self.pixel_of(scene_id, lat, lon)
+        radius = self.radius_in_pixels(scene_id, lat, buffer_m)
+
+        top, bottom = max(0, row - radius), min(rows, row + radius + 1)
+        left, right = max(0, col - radius), min(cols, col + radius + 1)
+        if top >= bottom or left >= right:
+            return None
+
+        x0, dx, _, y0, _, dy = meta['geotransform']
+        window_transform = (x0 + left * dx, dx, 0, y0 + top * dy, 0, dy)
+        return Window(
+            self.read_region(scene_id, top, left, bottom, right, bands),
+            center=(row - top, col - left),
+            radius_px=radius,
+            geotransform=window_transform,
+            nodata=meta['nodata']
+        )
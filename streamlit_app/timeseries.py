@@ -0,0 +1,133 @@
+"""
+Columnar satellite time series.
+
+A SatelliteSeries keeps one NumPy array per field (NDVI, bands, zonal
+statistics, cloud cover) next to a datetime64 timestamp array, instead of a
+list of per-observation dicts. Missing values are NaN. Slicing and the
+DataFrame round trip share memory with the underlying arrays, and indexing a
+single observation still returns a plain record dict for display code.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+TIME_UNIT = 'datetime64[s]'
+FLOAT_DTYPE = np.float32
+FIELDS = ('ndvi', 'red', 'nir', 'moisture', 'cloud_cover',
+          'ndvi_min', 'ndvi_max', 'ndvi_p10', 'ndvi_p90', 'valid_fraction', 'scenes')
+
+
+class SatelliteSeries:
+    """NDVI observations stored column-wise, sorted or not, with one source label per series"""
+
+    __slots__ = ('dates', 'columns', 'source')
+
+    def __init__(self, dates, source=None, **columns):
+        self.dates = np.asarray(dates, dtype=TIME_UNIT)
+        self.columns = {}
+        self.source = source
+        for name, values in columns.items():
+            if values is None:
+                continue
+            dtype = bool if name == 'measured' else FLOAT_DTYPE
+            array = np.asarray(values, dtype=dtype)
+            if array.shape != self.dates.shape:
+                raise ValueError(f"Column {name} has shape {array.shape}, expected {self.dates.shape}")
+            self.columns[name] = array
+        if 'ndvi' not in self.columns:
+            raise ValueError("A satellite series needs an ndvi column")
+
+    @classmethod
+    def empty(cls, source=None):
+        return cls(np.empty(0, dtype=TIME_UNIT), source=source, ndvi=np.empty(0))
+
+    @classmethod
+    def from_records(cls, records, source=None):
+        """Build from a list of {'date', 'ndvi', ...} dicts (fields missing from a record become NaN)"""
+        records = list(records)
+        if source is None and records:
+            source = records[0].get('source')
+        names = [name for name in (*FIELDS, 'measured') if any(name in r for r in records)]
+        columns = {
+            name: [r.get(name, False if name == 'measured' else np.nan) for r in records]
+            for name in names
+        }
+        if 'ndvi' not in columns:
+            columns['ndvi'] = []
+        return cls([np.datetime64(r['date'], 's') for r in records], source=source, **columns)
+
+    @classmethod
+    def from_frame(cls, frame, source=None):
+        """Wrap a DataFrame with a 'date' column; columns are not copied"""
+        columns = {name: frame[name].to_numpy(copy=False) for name in frame.columns if name != 'date'}
+        return cls(frame['date'].to_numpy(copy=False), source=source, **columns)
+
+    def to_frame(self):
+        """DataFrame sharing memory with this series' arrays"""
+        import pandas as pd
+
+        return pd.DataFrame({'date': self.dates, **self.columns}, copy=False)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getattr__(self, name):
+        try:
+            return object.__getattribute__(self, 'columns')[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, index):
+        if isinstance(index, (slice, np.ndarray, list)):
+            return self.take(index)
+        record = {'date': self.dates[index].astype(datetime)}
+        for name, values in self.columns.items():
+            record[name] = values[index].item()
+        if self.source is not None:
+            record['source'] = self.source
+        return record
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, index):
+        """Subset by slice (a view), index array or boolean mask"""
+        return SatelliteSeries(self.dates[index], source=self.source,
+                               **{name: values[index] for name, values in self.columns.items()})
+
+    def sorted(self):
+        order = np.argsort(self.dates, kind='stable')
+        return self.take(order)
+
+    def to_records(self):
+        return list(self)
+
+    def days(self):
+        """Days since the first observation as floats"""
+        if len(self) == 0:
+            return np.empty(0)
+        return (self.dates - self.dates[0]) / np.timedelta64(1, 'D')
+
+    def date_strings(self):
+        return np.datetime_as_string(self.dates, unit='D')
+
+    @property
+    def start(self):
+        return self.dates[0].astype(datetime)
+
+    @property
+    def end(self):
+        return self.dates[-1].astype(datetime)
+
+    @property
+    def nbytes(self):
+        return self.dates.nbytes + sum(values.nbytes for values in self.columns.values())
+
+
+def as_series(data):
+    """Accept a SatelliteSeries or a list of record dicts"""
+    if isinstance(data, SatelliteSeries):
+        return data
+    return SatelliteSeries.from_records(data)
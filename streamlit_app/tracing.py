@@ -0,0 +1,268 @@
+"""
+Lightweight per-stage tracing.
+
+A trace covers one analysis run. Spans time each stage with perf_counter and
+are attached to the active trace through a context variable, so nested
+helpers become child spans and work handed to a thread with bind() reports
+into the run that started it. Every finished span also feeds process-wide
+per-stage histograms shared by all sessions, exported in Prometheus text
+format; finished traces are kept in a short ring and can be exported as
+JSONL.
+
+A span costs two clock reads, a dict and a histogram update under a lock,
+so tracing stays on in production. CLUDO_TRACE_LOG appends every finished
+trace to a JSONL file and CLUDO_METRICS_FILE rewrites a Prometheus textfile
+(for node_exporter's textfile collector) after each trace.
+"""
+
+import bisect
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_RECENT_TRACES = 50
+METRIC_NAME = "cludo_stage_duration_seconds"
+
+# (trace, parent span id) of the code currently running
+_current = contextvars.ContextVar('cludo_trace', default=(None, None))
+_span_ids = itertools.count(1)
+
+
+class Trace:
+    """Spans of one run, with start offsets relative to the start of the run"""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span['start'])
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration': self.duration,
+            'attrs': self.attrs,
+            'spans': spans,
+        }
+
+
+class StageStats:
+    """Histogram of one stage's durations"""
+
+    __slots__ = ('count', 'total', 'max', 'errors', 'buckets')
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.buckets = [0] * (bucket_count + 1)
+
+
+class Tracer:
+    """Collects spans into traces and aggregates stage timings across sessions"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, recent=DEFAULT_RECENT_TRACES, trace_log=None, metrics_file=None):
+        self.bucket_bounds = tuple(buckets)
+        self.trace_log = trace_log
+        self.metrics_file = metrics_file
+        self.recent = deque(maxlen=recent)
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def observe(self, stage, seconds, error=False):
+        """Record one duration for a stage"""
+        slot = bisect.bisect_left(self.bucket_bounds, seconds)
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats(len(self.bucket_bounds))
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.buckets[slot] += 1
+            if error:
+                stats.errors += 1
+
+    @contextmanager
+    def trace(self, name, **attrs):
+        """Make a new trace current for the duration of the block"""
+        trace = Trace(name, **attrs)
+        token = _current.set((trace, None))
+        error = False
+        try:
+            yield trace
+        except BaseException:
+            error = True
+            raise
+        finally:
+            _current.reset(token)
+            trace.duration = time.perf_counter() - trace.origin
+            self.observe(name, trace.duration, error)
+            self.recent.append(trace)
+            self._export(trace)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time a stage; nested spans become its children in the current trace"""
+        trace, parent = _current.get()
+        span_id = next(_span_ids)
+        token = _current.set((trace, span_id))
+        started = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            _current.reset(token)
+            self.observe(name, duration, error is not None)
+            if trace is not None:
+                trace.add({
+                    'id': span_id,
+                    'parent': parent,
+                    'name': name,
+                    'start': started - trace.origin,
+                    'duration': duration,
+                    'thread': threading.current_thread().name,
+                    'error': error,
+                    'attrs': attrs,
+                })
+
+    def summary(self):
+        """{stage: count, mean, max, errors and bucket-interpolated p50/p95}, sorted by total time"""
+        with self._lock:
+            stages = {name: (s.count, s.total, s.max, s.errors, list(s.buckets)) for name, s in self._stages.items()}
+        summary = {}
+        for name, (count, total, longest, errors, buckets) in sorted(stages.items(), key=lambda item: -item[1][1]):
+            summary[name] = {
+                'count': count,
+                'mean': total / count if count else 0.0,
+                'p50': self._quantile(buckets, count, 0.5, longest),
+                'p95': self._quantile(buckets, count, 0.95, longest),
+                'max': longest,
+                'errors': errors,
+            }
+        return summary
+
+    def _quantile(self, buckets, count, q, longest):
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for slot, bucket_count in enumerate(buckets):
+            if bucket_count and seen + bucket_count >= rank:
+                low = self.bucket_bounds[slot - 1] if slot > 0 else 0.0
+                high = self.bucket_bounds[slot] if slot < len(self.bucket_bounds) else longest
+                return min(low + (high - low) * (rank - seen) / bucket_count, longest)
+            seen += bucket_count
+        return longest
+
+    def prometheus_text(self):
+        """All stage histograms in the Prometheus text exposition format"""
+        with self._lock:
+            stages = {name: (s.count, s.total, s.errors, list(s.buckets)) for name, s in sorted(self._stages.items())}
+
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each analysis stage",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for name, (count, total, _, buckets) in stages.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.bucket_bounds, '+Inf'), buckets):
+                cumulative += bucket_count
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {count}')
+
+        lines += ["# HELP cludo_stage_errors_total Stage runs that raised", "# TYPE cludo_stage_errors_total counter"]
+        lines += [f'cludo_stage_errors_total{{stage="{name}"}} {errors}' for name, (_, _, errors, _) in stages.items()]
+        return "\n".join(lines) + "\n"
+
+    def jsonl(self, traces=None):
+        """Finished traces (the recent ones by default), one JSON object per line"""
+        traces = list(self.recent) if traces is None else traces
+        return "".join(json.dumps(trace.to_dict(), default=str) + "\n" for trace in traces)
+
+    def _export(self, trace):
+        if not self.trace_log and not self.metrics_file:
+            return
+        try:
+            with self._write_lock:
+                if self.trace_log:
+                    with open(self.trace_log, 'a') as f:
+                        f.write(self.jsonl([trace]))
+                if self.metrics_file:
+                    # Write then rename so the collector never reads a half-written file
+                    partial = f"{self.metrics_file}.{os.getpid()}.tmp"
+                    with open(partial, 'w') as f:
+                        f.write(self.prometheus_text())
+                    os.replace(partial, self.metrics_file)
+        except OSError:
+            # Export must never break an analysis
+            pass
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+        self.recent.clear()
+
+
+def bind(fn):
+    """Run fn (e.g. on a worker thread) inside the trace and span that were current when bound"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer, created on first use"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(trace_log=os.getenv("CLUDO_TRACE_LOG"), metrics_file=os.getenv("CLUDO_METRICS_FILE"))
+    return _tracer
+
+
+def span(name, **attrs):
+    """Span on the process-wide tracer"""
+    return get_tracer().span(name, **attrs)
+
+
+def traced(name):
+    """Decorator wrapping every call of a function in a span"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,210 @@
+"""
+Vectorized NDVI trend and change-point engine for the no-LLM analysis path.
+
+Works on a (sites, T) matrix of NDVI values with matching observation days
+(NaN-padded where series are shorter), so a whole batch is assessed in one
+pass:
+
+- robust slope: Theil-Sen median of pairwise slopes (pairs are sampled on
+  long series to keep the cost bounded)
+- seasonality: annual harmonic fitted to the detrended values
+- change point: the strongest persistent level shift between windowed
+  medians of the deseasonalized series, scored against a noise level
+  estimated from successive differences, so one noisy observation cannot
+  trigger it; a detected step is removed before the slope is refitted
+"""
+
+import numpy as np
+
+from timeseries import as_series
+
+DAYS_PER_YEAR = 365.25
+MAX_PAIRS = 1024                  # pairwise slopes per site for Theil-Sen
+MIN_SEASONAL_SPAN = 300           # days of data needed to fit an annual cycle
+MIN_SEASONAL_POINTS = 6
+LEVEL_WINDOW_DAYS = 90            # current level = median of the last 90 days
+CHANGE_WINDOW = 5                 # observations compared on each side of a change
+CHANGE_SCORE_THRESHOLD = 4.0
+MIN_CHANGE_SHIFT = 0.05
+NOISE_FLOOR = 1e-3
+
+_PLAIN_REDUCERS = {np.nanmedian: np.median, np.nanmin: np.min, np.nanmax: np.max}
+
+
+def series_matrix(series_list):
+    """(values, days) arrays of shape (sites, T) from SatelliteSeries (or record lists), NaN-padded"""
+    series_list = [as_series(series) for series in series_list]
+    width = max((len(series) for series in series_list), default=0)
+    values = np.full((len(series_list), width), np.nan)
+    days = np.full((len(series_list), width), np.nan)
+    for row, series in enumerate(series_list):
+        values[row, :len(series)] = series.ndvi
+        days[row, :len(series)] = series.days()
+    return values, days
+
+
+def _pairs(length, rng):
+    """Index pairs (i < j) for pairwise slopes, sampled when there are too many"""
+    if length * (length - 1) // 2 <= MAX_PAIRS:
+        return np.triu_indices(length, k=1)
+    i, j = rng.integers(0, length, size=(2, MAX_PAIRS))
+    keep = i != j
+    return np.minimum(i, j)[keep], np.maximum(i, j)[keep]
+
+
+def theil_sen(values, days, seed=0):
+    """Per-site (slope per day, intercept) from the median of pairwise slopes"""
+    i, j = _pairs(values.shape[1], np.random.default_rng(seed))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (values[:, j] - values[:, i]) / (days[:, j] - days[:, i])
+    slopes[~np.isfinite(slopes)] = np.nan
+
+    slope = _nan_reduce(np.nanmedian, slopes)
+    intercept = _nan_reduce(np.nanmedian, values - np.nan_to_num(slope)[:, None] * days)
+    return slope, intercept
+
+
+def seasonal_component(residuals, days):
+    """Annual harmonic fitted per site by least squares; zero where the series is too short"""
+    valid = np.isfinite(residuals) & np.isfinite(days)
+    phase = 2 * np.pi * np.where(valid, days, 0) / DAYS_PER_YEAR
+    design = np.stack([np.ones_like(phase), np.sin(phase), np.cos(phase)], axis=-1)
+    weighted = design * valid[..., None]
+
+    normal = np.einsum('stk,stl->skl', weighted, design) + np.eye(3) * 1e-9
+    target = np.einsum('stk,st->sk', weighted, np.where(valid, residuals, 0))
+    coeffs = np.linalg.solve(normal, target[..., None])[..., 0]
+
+    span = _nan_reduce(np.nanmax, np.where(valid, days, np.nan)) - _nan_reduce(np.nanmin, np.where(valid, days, np.nan))
+    fit = (np.nan_to_num(span) >= MIN_SEASONAL_SPAN) & (valid.sum(axis=1) >= MIN_SEASONAL_POINTS)
+    coeffs[~fit] = 0
+
+    seasonal = np.einsum('stk,sk->st', design[..., 1:], coeffs[:, 1:])
+    return np.where(valid, seasonal, np.nan), np.hypot(coeffs[:, 1], coeffs[:, 2])
+
+
+def noise_level(series):
+    """Robust per-site noise from successive differences (insensitive to one step change)"""
+    compact = _compact(series)
+    steps = np.diff(compact, axis=1)
+    median = _nan_reduce(np.nanmedian, steps)
+    mad = _nan_reduce(np.nanmedian, np.abs(steps - median[:, None]))
+    return np.maximum(np.nan_to_num(mad * 1.4826 / np.sqrt(2)), NOISE_FLOOR)
+
+
+def change_point(series, noise, window=CHANGE_WINDOW):
+    """Strongest persistent level shift per site: (index of first point after it, shift, score)
+
+    Compares the median of the `window` observations before each split with
+    the median of the `window` after it, so a single outlier cannot create a
+    change and a gradual trend only contributes its drift across one window.
+    """
+    sites, length = series.shape
+    if length < 2 * window:
+        zeros = np.zeros(sites)
+        return zeros.astype(int), zeros, zeros
+
+    valid = np.isfinite(series)
+    order = np.argsort(~valid, axis=1, kind='stable')
+    compact = np.take_along_axis(series, order, axis=1)
+
+    # Windows that reach into the NaN padding come out as NaN and are never chosen
+    medians = np.median(np.lib.stride_tricks.sliding_window_view(compact, window, axis=1), axis=-1)
+    shift = medians[:, window:] - medians[:, :-window]
+    score = np.abs(shift) / noise[:, None]
+    score = np.where(np.isfinite(score), score, 0)
+
+    best = np.argmax(score, axis=1)
+    rows = np.arange(sites)
+    change_index = order[rows, best + window]
+    return change_index, np.nan_to_num(shift[rows, best]), score[rows, best]
+
+
+def _fit(values, days):
+    """Robust trend, then the seasonal cycle around it, then the trend again without the cycle"""
+    slope, intercept = theil_sen(values, days)
+    trend = intercept[:, None] + np.nan_to_num(slope)[:, None] * days
+    seasonal, amplitude = seasonal_component(values - trend, days)
+    slope, intercept = theil_sen(values - np.nan_to_num(seasonal), days)
+    return slope, intercept, seasonal, amplitude
+
+
+def analyze_trends(values, days):
+    """Trend, seasonality and change-point statistics for every site in one pass"""
+    values = np.asarray(values, dtype=np.float64)
+    days = np.asarray(days, dtype=np.float64)
+    values = np.where(np.isfinite(days), values, np.nan)
+
+    slope, intercept, seasonal, amplitude = _fit(values, days)
+    deseasonalized = values - np.nan_to_num(seasonal)
+    noise = noise_level(deseasonalized)
+    change_index, change_shift, change_score = change_point(deseasonalized, noise)
+    change_detected = (change_score >= CHANGE_SCORE_THRESHOLD) & (np.abs(change_shift) >= MIN_CHANGE_SHIFT)
+
+    if change_detected.any():
+        # Refit the changed sites with the step removed so the slope describes the gradual trend only
+        rows = np.flatnonzero(change_detected)
+        after = np.arange(values.shape[1])[None, :] >= change_index[rows, None]
+        adjusted = values[rows] - np.where(after, change_shift[rows, None], 0)
+        slope[rows], intercept[rows], seasonal[rows], amplitude[rows] = _fit(adjusted, days[rows])
+        deseasonalized = values - np.nan_to_num(seasonal)
+
+    observed_days = np.where(np.isfinite(values), days, np.nan)
+    first_day, last_day = _nan_reduce(np.nanmin, observed_days), _nan_reduce(np.nanmax, observed_days)
+    recent = observed_days >= (last_day - LEVEL_WINDOW_DAYS)[:, None]
+    level = _nan_reduce(np.nanmedian, np.where(recent, deseasonalized, np.nan))
+
+    return {
+        'observations': np.isfinite(values).sum(axis=1),
+        'slope_per_year': np.nan_to_num(slope) * DAYS_PER_YEAR,
+        'trend_change': np.nan_to_num(slope * (last_day - first_day)),
+        'level': level,
+        'seasonal_amplitude': amplitude,
+        'noise': noise,
+        'change_index': change_index,
+        'change_shift': change_shift,
+        'change_score': change_score,
+        'change_detected': change_detected,
+    }
+
+
+def classify_risk(trends):
+    """Vectorized risk levels, deforestation flags and confidence from analyze_trends output"""
+    level = np.nan_to_num(trends['level'], nan=1.0)
+    abrupt_drop = np.where(trends['change_detected'], np.minimum(trends['change_shift'], 0), 0)
+    decline = np.minimum(trends['trend_change'], 0) + abrupt_drop
+
+    critical = (level < 0.3) | (decline < -0.2)
+    high = (level < 0.4) | (decline < -0.1)
+    medium = level < 0.5
+    risk = np.select([critical, high, medium], ['critical', 'high', 'medium'], default='low')
+
+    coverage = np.minimum(trends['observations'] / 24, 1)
+    clarity = 1 - 0.5 * np.minimum(trends['noise'] / 0.1, 1)
+    confidence = np.clip(0.4 + 0.5 * coverage * clarity, 0.3, 0.9)
+
+    return {
+        'risk': risk,
+        'deforestation': critical | (abrupt_drop < -0.1),
+        'confidence': confidence,
+    }
+
+
+def _compact(values):
+    """Shift each row's finite values to the front (NaN-padded), preserving order"""
+    valid = np.isfinite(values)
+    order = np.argsort(~valid, axis=1, kind='stable')
+    return np.take_along_axis(values, order, axis=1)
+
+
+def _nan_reduce(reducer, array):
+    """Row-wise NaN-aware reduction that returns NaN for all-NaN rows without warnings"""
+    finite = np.isfinite(array)
+    if finite.all() and array.shape[1] > 0:
+        # Dense input: the plain reduction is markedly faster than the NaN-aware one
+        return _PLAIN_REDUCERS[reducer](array, axis=1)
+    result = np.full(array.shape[0], np.nan)
+    rows = finite.any(axis=1)
+    if rows.any():
+        result[rows] = reducer(array[rows], axis=1)
+    return result
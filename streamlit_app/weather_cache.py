@@ -0,0 +1,158 @@
+"""
+Shared current-weather cache keyed by geohash cell.
+
+Current conditions are effectively the same across a few kilometres and
+only change every few minutes, so lookups are keyed on the geohash cell of
+the point rather than the exact coordinates. A fresh entry is served from
+memory; a stale one (older than the TTL but within the stale window) is
+served immediately while a background refresh fetches a new one. Only a
+missing or expired cell makes the caller wait, and concurrent misses for one
+cell share a single request.
+
+Entries can also be written through to a TieredCache store so other
+processes on the same cache directory (batch workers) see them; warm()
+fetches every cell of a site list up front.
+"""
+
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from geo import geohash
+from rate_limit import lane
+
+DEFAULT_PRECISION = 5            # geohash characters; about 4.9 x 4.9 km cells
+DEFAULT_TTL = 10 * 60            # seconds an entry is served without a refresh
+DEFAULT_STALE_TTL = 60 * 60      # seconds a stale entry is still served while it refreshes
+DEFAULT_REFRESH_WORKERS = 2
+DEFAULT_WARM_WORKERS = 8
+DEFAULT_MAX_CELLS = 10000
+
+# Audit points repeat, so their cells are memoized
+_cell = functools.lru_cache(maxsize=4096)(geohash)
+
+
+class WeatherCache:
+    """Geohash-cell weather cache with TTL, stale-while-revalidate and bulk warm-up"""
+
+    def __init__(self, fetch, precision=DEFAULT_PRECISION, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL,
+                 store=None, max_cells=DEFAULT_MAX_CELLS, refresh_workers=DEFAULT_REFRESH_WORKERS, clock=time.time):
+        self.fetch = fetch
+        self.precision = precision
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.store = store
+        self.max_cells = max_cells
+        self._clock = clock
+        self._entries = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cludo-weather")
+        self.counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0}
+
+    def cell(self, lat, lon):
+        return _cell(round(lat, 6), round(lon, 6), self.precision)
+
+    def get(self, lat, lon):
+        """Weather for the cell containing a point; None if it cannot be fetched"""
+        cell = self.cell(lat, lon)
+        entry = self._entry(cell)
+        if entry is not None:
+            age = self._clock() - entry['fetched_at']
+            if age <= self.ttl:
+                self._count('hits')
+                return entry['value']
+            if age <= self.stale_ttl:
+                self._count('stale_hits')
+                self._fetch_once(cell, lat, lon, background=True)
+                return entry['value']
+
+        self._count('misses')
+        return self._fetch_once(cell, lat, lon).result()
+
+    def warm(self, locations, max_workers=DEFAULT_WARM_WORKERS):
+        """Fetch every cell of (lat, lon) locations that has no fresh entry; returns the number fetched"""
+        cells = {}
+        for lat, lon in locations:
+            cell = self.cell(lat, lon)
+            if cell not in cells and not self._fresh(cell):
+                cells[cell] = (lat, lon)
+        if not cells:
+            return 0
+
+        # Warm-ups are background work and queue behind interactive lookups at the rate limiter
+        def fetch(item):
+            cell, (lat, lon) = item
+            with lane('batch'):
+                return self._fetch_once(cell, lat, lon).result()
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(cells)), thread_name_prefix="cludo-warm") as pool:
+            return sum(value is not None for value in pool.map(fetch, cells.items()))
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, 'cells': len(self._entries), 'refreshing': len(self._pending)}
+
+    def _entry(self, cell):
+        entry = self._entries.get(cell)
+        if entry is None and self.store is not None:
+            # Another process may have fetched it
+            entry = self.store.get(cell)
+            if entry is not None:
+                with self._lock:
+                    self._entries.setdefault(cell, entry)
+        return entry
+
+    def _fresh(self, cell):
+        entry = self._entry(cell)
+        return entry is not None and self._clock() - entry['fetched_at'] <= self.ttl
+
+    def _fetch_once(self, cell, lat, lon, background=False):
+        """Future of the cell's fetch, joining the one already running"""
+        with self._lock:
+            future = self._pending.get(cell)
+            if future is not None:
+                return future
+            future = self._pending[cell] = Future()
+
+        if background:
+            self._executor.submit(self._refresh, cell, lat, lon, future)
+        else:
+            self._run(cell, lat, lon, future)
+        return future
+
+    def _refresh(self, cell, lat, lon, future):
+        with lane('batch'):
+            self._count('refreshes')
+            self._run(cell, lat, lon, future)
+
+    def _run(self, cell, lat, lon, future):
+        value = None
+        try:
+            value = self.fetch(lat, lon)
+        except Exception:
+            pass
+        finally:
+            if value is None:
+                # Keep serving the stale entry, if any, until it ages out
+                self._count('errors')
+            else:
+                self._put(cell, {'value': value, 'fetched_at': self._clock()})
+            with self._lock:
+                del self._pending[cell]
+            future.set_result(value)
+
+    def _put(self, cell, entry):
+        with self._lock:
+            self._entries[cell] = entry
+            if len(self._entries) > self.max_cells:
+                # Keep the most recently fetched three quarters so trimming stays rare
+                newest = sorted(self._entries.items(), key=lambda item: item[1]['fetched_at'])
+                self._entries = dict(newest[-(self.max_cells * 3 // 4):])
+        if self.store is not None:
+            self.store.set(cell, entry)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1